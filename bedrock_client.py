@@ -4,10 +4,241 @@ Used for workspace AI and extraction agents
 """
 
 import os
+import io
+import re
 import json
 import time
 import base64
-from typing import List, Tuple, Dict, Any, Optional
+import random
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor
+from typing import List, Tuple, Dict, Any, Optional, Union, Iterator
+from logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# orjson parses large model responses (and serializes large document
+# request bodies) several times faster than the stdlib. Shared with
+# document_shredder and llm_integration; json_dumps always returns UTF-8 bytes.
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode()
+
+# Optional ```/```json fence around a JSON response; group 1 is the body.
+# The closing fence is optional so truncated responses still match.
+_JSON_FENCE_RE = re.compile(r'^\s*(?:```(?:json)?)?\s*(.*?)\s*(?:```)?\s*$', re.S)
+
+# Document types handled by BedrockClaude.build_document_content
+IMAGE_MEDIA_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+}
+TEXT_EXTENSIONS = frozenset({'txt', 'csv', 'json'})
+SUPPORTED_EXTENSIONS = frozenset(IMAGE_MEDIA_TYPES) | TEXT_EXTENSIONS | {'pdf', 'docx'}
+
+# Claude scales images down to ~1568px on the long edge anyway, so larger
+# images only cost upload time (and risk the 5MB per-image limit)
+MAX_IMAGE_EDGE = 1568
+IMAGE_DOWNSAMPLE_THRESHOLD = 512_000  # bytes
+
+# Claude context window, and the conservative chars-per-token estimate used to
+# size prompts locally (dense tables and numbers tokenize at ~3 chars/token)
+MODEL_CONTEXT_TOKENS = int(os.environ.get("BEDROCK_MODEL_CONTEXT_TOKENS", "200000"))
+CHARS_PER_TOKEN = 3
+
+# PDF/DOCX text extraction and image re-encoding are CPU-bound and hold the GIL;
+# large inputs run in a worker process pool instead (0 disables the pool)
+CPU_POOL_WORKERS = int(os.environ.get("BEDROCK_CPU_WORKERS", str(os.cpu_count() or 1)))
+CPU_POOL_MIN_BYTES = 1_000_000
+
+# Workers must not be forked from the request-serving process (request
+# threads, held locks, live connection pools). A forkserver imports the main
+# module once and forks workers from there; the only thread it runs is the
+# logging listener, and logging_utils points forked children at stdout.
+CPU_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+_cpu_pool_disabled = CPU_POOL_WORKERS <= 0
+
+
+def _extract_pdf_text(file_bytes: bytes) -> str:
+    """Extract the text of every page of a PDF (runs in the CPU pool)"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(io.BytesIO(file_bytes))
+    text_parts = []
+    for page in reader.pages:
+        text = page.extract_text()
+        if text:
+            text_parts.append(text)
+    return "\n\n".join(text_parts)
+
+
+# WordprocessingML tags, in the Clark notation lxml uses for element.tag
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = _W_NS + "p"
+_W_TBL = _W_NS + "tbl"
+_W_TR = _W_NS + "tr"
+_W_TC = _W_NS + "tc"
+_W_T = _W_NS + "t"
+_W_TAB = _W_NS + "tab"
+_W_TABS = _W_NS + "tabs"
+_W_BR = _W_NS + "br"
+_W_CR = _W_NS + "cr"
+
+
+def _docx_paragraph_text(p) -> str:
+    """Text of a <w:p> element, with tabs and line breaks kept"""
+    parts = []
+    for node in p.iter(_W_T, _W_TAB, _W_BR, _W_CR):
+        if node.tag == _W_T:
+            parts.append(node.text or "")
+        elif node.tag == _W_TAB:
+            # <w:tabs><w:tab/> in paragraph properties are tab stops, not text
+            if node.getparent().tag != _W_TABS:
+                parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts)
+
+
+def extract_docx_text(file_bytes: bytes) -> str:
+    """
+    Extract the text of a DOCX body: paragraphs, and table rows as "a | b | c"
+    (large files run in the CPU pool)
+
+    Walks the underlying lxml tree directly instead of python-docx's
+    paragraph/table/cell wrappers, which re-resolve the table grid on every
+    cell access and get very slow on large requirement tables.
+    """
+    from docx import Document as DocxDocument
+    body = DocxDocument(io.BytesIO(file_bytes)).element.body
+
+    # Write straight into one buffer rather than holding every block (and
+    # every row of a large table) as a separate string until a final join
+    buf = io.StringIO()
+    for block in body.iterchildren(_W_P, _W_TBL):
+        if block.tag == _W_P:
+            text = _docx_paragraph_text(block)
+            if text.strip():
+                if buf.tell():
+                    buf.write("\n\n")
+                buf.write(text)
+            continue
+
+        for row in block.iterchildren(_W_TR):
+            row_started = False
+            for cell in row.iterchildren(_W_TC):
+                cell_text = "\n".join(_docx_paragraph_text(p) for p in cell.iterchildren(_W_P)).strip()
+                if not cell_text:
+                    continue
+                if row_started:
+                    buf.write(" | ")
+                elif buf.tell():
+                    buf.write("\n\n")
+                buf.write(cell_text)
+                row_started = True
+
+    return buf.getvalue()
+
+
+def _resize_image(image_bytes: bytes) -> bytes:
+    """Shrink an image to MAX_IMAGE_EDGE and re-encode it as JPEG (runs in the CPU pool)"""
+    from PIL import Image
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode == "P":
+        # Expand palettes first so resizing interpolates and the transparency index becomes alpha
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE))
+    if img.mode in ("RGBA", "LA", "PA"):
+        # JPEG has no alpha: flatten onto white so dark content on a transparent background stays visible
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img.convert("RGBA"), mask=img.getchannel("A"))
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85, optimize=True)
+    return buf.getvalue()
+
+
+def _run_cpu_bound(func, data: bytes, min_bytes: int = CPU_POOL_MIN_BYTES):
+    """
+    Run func(data) in the shared process pool, or inline for inputs under min_bytes
+
+    Falls back to running inline if a pool can't be used here (e.g. inside a
+    daemonic Celery worker, which may not start child processes). If a worker
+    dies (OOM, crash) the broken pool is dropped, a new one is started on the
+    next call, and this input is processed inline.
+    """
+    global _cpu_pool, _cpu_pool_disabled
+
+    if _cpu_pool_disabled or len(data) < min_bytes:
+        return func(data)
+
+    pool = None
+    try:
+        with _cpu_pool_lock:
+            if _cpu_pool is None:
+                _cpu_pool = ProcessPoolExecutor(
+                    max_workers=CPU_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context(CPU_POOL_START_METHOD)
+                )
+            pool = _cpu_pool
+        future = pool.submit(func, data)
+    except BrokenExecutor as e:
+        _discard_cpu_pool(pool, e)
+        return func(data)
+    except Exception as e:
+        logger.warning(f"⚠️ CPU process pool unavailable, running inline: {e}")
+        _cpu_pool_disabled = True
+        return func(data)
+
+    try:
+        return future.result()
+    except BrokenExecutor as e:
+        _discard_cpu_pool(pool, e)
+        return func(data)
+
+
+def _discard_cpu_pool(pool: ProcessPoolExecutor, error: Exception) -> None:
+    """Drop a broken CPU pool so the next _run_cpu_bound call starts a fresh one"""
+    global _cpu_pool
+
+    logger.warning(f"⚠️ CPU process pool broke, running inline: {error}")
+    with _cpu_pool_lock:
+        if _cpu_pool is pool:
+            _cpu_pool = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _merge_text_blocks(content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Coalesce runs of adjacent text blocks into a single text block
+
+    Each document contributes its own text blocks (body, separators, alias
+    notes); sending them as one block per run keeps the request body small.
+    """
+    merged = []
+    for block in content:
+        if block.get("type") == "text" and merged and merged[-1].get("type") == "text":
+            merged[-1] = {"type": "text", "text": merged[-1]["text"] + block["text"]}
+        else:
+            merged.append(block)
+    return merged
+
 
 # Bedrock availability flag
 BEDROCK_AVAILABLE = False
@@ -19,7 +250,7 @@ try:
     from botocore.config import Config
     BEDROCK_AVAILABLE = True
 except ImportError:
-    print("⚠️ boto3 not installed. Bedrock features will be unavailable.")
+    logger.warning("⚠️ boto3 not installed. Bedrock features will be unavailable.")
 
 
 def init_bedrock_client():
@@ -32,11 +263,14 @@ def init_bedrock_client():
     try:
         region = os.environ.get("AWS_REGION", "us-east-1")
 
-        # Configure longer timeout for large Claude extractions (5 minutes)
+        # Configure longer timeout for large Claude extractions (5 minutes).
+        # The client is shared by every request thread, so size its HTTP pool
+        # above botocore's default of 10 to keep concurrent calls in flight.
         bedrock_config = Config(
             read_timeout=300,
             connect_timeout=30,
-            retries={'max_attempts': 3}
+            retries={'max_attempts': 3},
+            max_pool_connections=int(os.environ.get("BEDROCK_MAX_CONNECTIONS", "50"))
         )
 
         # Build client kwargs - only include credentials if explicitly set
@@ -55,10 +289,10 @@ def init_bedrock_client():
             client_kwargs['aws_secret_access_key'] = secret_key
 
         bedrock_client = boto3.client(**client_kwargs)
-        print(f"✅ Bedrock client initialized (region: {region})")
+        logger.info(f"✅ Bedrock client initialized (region: {region})")
         return bedrock_client
     except Exception as e:
-        print(f"❌ Failed to initialize Bedrock client: {e}")
+        logger.error(f"❌ Failed to initialize Bedrock client: {e}")
         BEDROCK_AVAILABLE = False
         return None
 
@@ -78,16 +312,61 @@ class BedrockClaude:
     CLAUDE_SONNET = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
     CLAUDE_HAIKU = "us.anthropic.claude-3-haiku-20240307-v1:0"
 
+    # Bedrock errors worth retrying: rate limits and transient service faults
+    RETRYABLE_ERROR_CODES = frozenset({
+        'ThrottlingException',
+        'ServiceUnavailableException',
+        'ModelNotReadyException',
+        'InternalServerException',
+        'ModelStreamErrorException',
+        'ModelTimeoutException',
+    })
+
+    # Errors caused by the request itself; retrying can't succeed
+    CLIENT_ERROR_CODES = frozenset({
+        'ValidationException',
+        'AccessDeniedException',
+        'ResourceNotFoundException',
+    })
+
     def __init__(self, model_id: str = None):
         self.client = get_bedrock_client()
         self.model_id = model_id or os.environ.get("BEDROCK_MODEL_ID", self.CLAUDE_SONNET)
         self.max_retries = 3
         self.retry_delay = 5  # seconds
+        self.max_retry_delay = 20  # seconds
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """
+        Whether a failed Bedrock call is worth retrying
+
+        Throttling, 5xx and unrecognised errors (including transport errors
+        like timeouts and dropped connections) are retried; client errors
+        such as ValidationException fail straight away.
+        """
+        if not isinstance(error, ClientError):
+            return True
+
+        # Stream events report codes in camelCase (e.g. throttlingException)
+        code = error.response.get('Error', {}).get('Code', '')
+        code = code[:1].upper() + code[1:]
+        if code in self.RETRYABLE_ERROR_CODES:
+            return True
+        if code in self.CLIENT_ERROR_CODES:
+            return False
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        if status:
+            return status == 429 or status >= 500
+        return True
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter, so parallel callers don't retry in lockstep"""
+        return min(self.retry_delay * (2 ** attempt) + random.uniform(0, self.retry_delay), self.max_retry_delay)
 
     def call_claude(
         self,
         prompt: str,
-        system: str = None,
+        system: Union[str, List[Dict[str, Any]]] = None,
         max_tokens: int = 4096,
         temperature: float = 0.2,
         response_format: str = "json"
@@ -97,7 +376,8 @@ class BedrockClaude:
 
         Args:
             prompt: User message/prompt
-            system: System prompt (optional)
+            system: System prompt (optional), either a string or a list of
+                text blocks (e.g. with cache_control on a static prefix)
             max_tokens: Maximum output tokens
             temperature: Response temperature (0-1)
             response_format: "json" to parse as JSON, "text" for raw text
@@ -121,16 +401,19 @@ class BedrockClaude:
         if system:
             body["system"] = system
 
+        # Serialize once, not on every retry attempt
+        payload = json_dumps(body)
+
         # Retry logic with exponential backoff
         last_error = None
         for attempt in range(self.max_retries):
             try:
                 response = self.client.invoke_model(
                     modelId=self.model_id,
-                    body=json.dumps(body)
+                    body=payload
                 )
 
-                response_body = json.loads(response['body'].read())
+                response_body = json_loads(response['body'].read())
                 response_text = response_body['content'][0]['text'].strip()
 
                 # Parse JSON if requested
@@ -139,23 +422,13 @@ class BedrockClaude:
                 else:
                     return {"text": response_text}
 
-            except ClientError as e:
-                error_code = e.response.get('Error', {}).get('Code', '')
-                if error_code in ['ThrottlingException', 'ServiceUnavailableException']:
-                    last_error = e
-                    if attempt < self.max_retries - 1:
-                        wait_time = self.retry_delay * (2 ** attempt)
-                        print(f"⚠️ Bedrock rate limited (attempt {attempt + 1}/{self.max_retries}). Waiting {wait_time}s...")
-                        time.sleep(wait_time)
-                    else:
-                        raise
-                else:
-                    raise
             except Exception as e:
+                if not self._is_retryable(e):
+                    raise
                 last_error = e
                 if attempt < self.max_retries - 1:
-                    wait_time = self.retry_delay * (2 ** attempt)
-                    print(f"⚠️ Bedrock error (attempt {attempt + 1}/{self.max_retries}): {e}. Retrying in {wait_time}s...")
+                    wait_time = self._backoff_delay(attempt)
+                    logger.warning(f"⚠️ Bedrock error (attempt {attempt + 1}/{self.max_retries}): {e}. Retrying in {wait_time:.1f}s...")
                     time.sleep(wait_time)
                 else:
                     raise
@@ -216,16 +489,19 @@ class BedrockClaude:
         if system:
             body["system"] = system
 
+        # Serialize once, not on every retry attempt
+        payload = json_dumps(body)
+
         # Retry logic
         last_error = None
         for attempt in range(self.max_retries):
             try:
                 response = self.client.invoke_model(
                     modelId=self.model_id,
-                    body=json.dumps(body)
+                    body=payload
                 )
 
-                response_body = json.loads(response['body'].read())
+                response_body = json_loads(response['body'].read())
                 response_text = response_body['content'][0]['text'].strip()
 
                 if response_format == "json":
@@ -234,10 +510,12 @@ class BedrockClaude:
                     return {"text": response_text}
 
             except Exception as e:
+                if not self._is_retryable(e):
+                    raise
                 last_error = e
                 if attempt < self.max_retries - 1:
-                    wait_time = self.retry_delay * (2 ** attempt)
-                    print(f"⚠️ Bedrock error (attempt {attempt + 1}/{self.max_retries}): {e}. Retrying in {wait_time}s...")
+                    wait_time = self._backoff_delay(attempt)
+                    logger.warning(f"⚠️ Bedrock error (attempt {attempt + 1}/{self.max_retries}): {e}. Retrying in {wait_time:.1f}s...")
                     time.sleep(wait_time)
                 else:
                     raise
@@ -275,74 +553,140 @@ class BedrockClaude:
 
         # Process each document
         for file_bytes, filename in documents:
-            ext = filename.lower().split('.')[-1]
-
-            # Handle images directly
-            if ext in ['png', 'jpg', 'jpeg', 'gif', 'webp']:
-                media_type = f"image/{ext}" if ext != 'jpg' else "image/jpeg"
-                content.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": base64.b64encode(file_bytes).decode('utf-8')
-                    }
-                })
-                content.append({"type": "text", "text": f"\n--- Image: {filename} ---\n"})
-
-            # Handle PDFs - extract text
-            elif ext == 'pdf':
-                try:
-                    from PyPDF2 import PdfReader
-                    import io
-                    reader = PdfReader(io.BytesIO(file_bytes))
-                    text_parts = []
-                    for page in reader.pages:
-                        text = page.extract_text()
-                        if text:
-                            text_parts.append(text)
-                    pdf_text = "\n\n".join(text_parts)
-                    content.append({"type": "text", "text": f"\n--- Document: {filename} ---\n\n{pdf_text}\n\n--- End of {filename} ---\n"})
-                except Exception as e:
-                    print(f"⚠️ Failed to extract PDF text from {filename}: {e}")
-                    content.append({"type": "text", "text": f"\n--- Document: {filename} (PDF extraction failed) ---\n"})
-
-            # Handle DOCX
-            elif ext == 'docx':
-                try:
-                    from docx import Document as DocxDocument
-                    import io
-                    doc = DocxDocument(io.BytesIO(file_bytes))
-                    text_parts = []
-                    for para in doc.paragraphs:
-                        if para.text.strip():
-                            text_parts.append(para.text)
-                    for table in doc.tables:
-                        for row in table.rows:
-                            row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
-                            if row_text:
-                                text_parts.append(" | ".join(row_text))
-                    docx_text = "\n\n".join(text_parts)
-                    content.append({"type": "text", "text": f"\n--- Document: {filename} ---\n\n{docx_text}\n\n--- End of {filename} ---\n"})
-                except Exception as e:
-                    print(f"⚠️ Failed to extract DOCX text from {filename}: {e}")
-                    content.append({"type": "text", "text": f"\n--- Document: {filename} (DOCX extraction failed) ---\n"})
-
-            # Handle text files
-            elif ext in ['txt', 'csv', 'json']:
-                try:
-                    text = file_bytes.decode('utf-8')
-                    content.append({"type": "text", "text": f"\n--- Document: {filename} ---\n\n{text}\n\n--- End of {filename} ---\n"})
-                except:
-                    content.append({"type": "text", "text": f"\n--- Document: {filename} (decode failed) ---\n"})
+            content.extend(self.build_document_content(file_bytes, filename))
+
+        return self.call_claude_with_content(
+            prompt=prompt,
+            content=content,
+            system=system,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            response_format=response_format
+        )
 
-            else:
-                content.append({"type": "text", "text": f"\n--- Document: {filename} (unsupported format: {ext}) ---\n"})
+    def build_document_content(self, file_bytes: bytes, filename: str) -> List[Dict[str, Any]]:
+        """
+        Convert one document into Claude message content blocks
+
+        Text extraction happens here, so callers can prepare documents
+        independently (e.g. in download worker threads) before the model call.
+
+        Args:
+            file_bytes: Raw file bytes
+            filename: Original filename (extension selects the handler)
+
+        Returns:
+            List of content blocks for the document
+        """
+        content = []
+        ext = filename.rpartition('.')[2].lower()
+
+        # Handle images directly
+        if ext in IMAGE_MEDIA_TYPES:
+            media_type = IMAGE_MEDIA_TYPES[ext]
+            if len(file_bytes) > IMAGE_DOWNSAMPLE_THRESHOLD:
+                file_bytes, media_type = self._downsample_image(file_bytes, media_type, filename)
+            content.append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": media_type,
+                    "data": base64.b64encode(file_bytes).decode('utf-8')
+                }
+            })
+            content.append({"type": "text", "text": f"\n--- Image: {filename} ---\n"})
+
+        # Handle PDFs - extract text
+        elif ext == 'pdf':
+            try:
+                pdf_text = _run_cpu_bound(_extract_pdf_text, file_bytes)
+                content.append({"type": "text", "text": f"\n--- Document: {filename} ---\n\n{pdf_text}\n\n--- End of {filename} ---\n"})
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to extract PDF text from {filename}: {e}")
+                content.append({"type": "text", "text": f"\n--- Document: {filename} (PDF extraction failed) ---\n"})
+
+        # Handle DOCX
+        elif ext == 'docx':
+            try:
+                # DOCX is zipped XML, so far less input means the same parsing work
+                docx_text = _run_cpu_bound(extract_docx_text, file_bytes, min_bytes=CPU_POOL_MIN_BYTES // 8)
+                content.append({"type": "text", "text": f"\n--- Document: {filename} ---\n\n{docx_text}\n\n--- End of {filename} ---\n"})
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to extract DOCX text from {filename}: {e}")
+                content.append({"type": "text", "text": f"\n--- Document: {filename} (DOCX extraction failed) ---\n"})
+
+        # Handle text files
+        elif ext in TEXT_EXTENSIONS:
+            try:
+                text = file_bytes.decode('utf-8')
+                content.append({"type": "text", "text": f"\n--- Document: {filename} ---\n\n{text}\n\n--- End of {filename} ---\n"})
+            except:
+                content.append({"type": "text", "text": f"\n--- Document: {filename} (decode failed) ---\n"})
+
+        else:
+            content.append({"type": "text", "text": f"\n--- Document: {filename} (unsupported format: {ext}) ---\n"})
+
+        return content
+
+    def _downsample_image(self, image_bytes: bytes, media_type: str, filename: str) -> Tuple[bytes, str]:
+        """
+        Shrink an oversized image to MAX_IMAGE_EDGE and re-encode it as JPEG
+
+        Returns:
+            Tuple of (image_bytes, media_type); the original on failure or if
+            re-encoding doesn't make it smaller
+        """
+        try:
+            resized = _run_cpu_bound(_resize_image, image_bytes)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not downsample image {filename}: {e}")
+            return image_bytes, media_type
+
+        if len(resized) >= len(image_bytes):
+            return image_bytes, media_type
+
+        logger.info(f"🗜️ Downsampled {filename}: {len(image_bytes)} -> {len(resized)} bytes")
+        return resized, "image/jpeg"
+
+    def call_claude_with_content(
+        self,
+        prompt: str,
+        content: List[Dict[str, Any]],
+        system: Union[str, List[Dict[str, Any]]] = None,
+        max_tokens: int = 32768,
+        temperature: float = 0.2,
+        response_format: str = "json",
+        stream: bool = False,
+        prefill: str = None
+    ) -> Dict[str, Any]:
+        """
+        Call Claude with pre-built document content blocks
+
+        Args:
+            prompt: User message/prompt (appended after the documents)
+            content: Content blocks from build_document_content
+            system: System prompt (optional)
+            max_tokens: Maximum output tokens
+            temperature: Response temperature
+            response_format: "json" or "text"
+            stream: Receive the response as a token stream. Long generations
+                then keep the connection active instead of idling until the
+                whole response is ready (and hitting read_timeout).
+            prefill: Start of the assistant turn that Claude must continue
+                (e.g. "{" to force a bare JSON object with no markdown fence)
+
+        Returns:
+            Parsed response
+        """
+        if not self.client:
+            raise RuntimeError("Bedrock client not initialized. Check AWS credentials.")
 
-        # Add the prompt at the end
-        content.append({"type": "text", "text": f"\n\n{prompt}"})
+        # Add the prompt at the end (merging builds a new list, the caller's is untouched)
+        content = _merge_text_blocks(list(content) + [{"type": "text", "text": f"\n\n{prompt}"}])
 
         messages = [{"role": "user", "content": content}]
+        if prefill:
+            messages.append({"role": "assistant", "content": prefill})
 
         body = {
             "anthropic_version": "bedrock-2023-05-31",
@@ -354,19 +698,29 @@ class BedrockClaude:
         if system:
             body["system"] = system
 
+        # Serialize once, not on every retry attempt
+        payload = json_dumps(body)
+
         # Retry logic
         last_error = None
         for attempt in range(self.max_retries):
             try:
-                response = self.client.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps(body)
-                )
+                if stream:
+                    response_text = self._stream_text(payload)
+                else:
+                    response = self.client.invoke_model(
+                        modelId=self.model_id,
+                        body=payload
+                    )
 
-                response_body = json.loads(response['body'].read())
-                response_text = response_body['content'][0]['text'].strip()
+                    response_body = json_loads(response['body'].read())
+                    response_text = response_body['content'][0]['text'].strip()
+
+                # The model continues from the prefill, which is not echoed back
+                if prefill:
+                    response_text = prefill + response_text
 
-                print(f"✅ Claude response received ({len(response_text)} chars)")
+                logger.info(f"✅ Claude response received ({len(response_text)} chars)")
 
                 if response_format == "json":
                     return self._parse_json_response(response_text)
@@ -374,10 +728,12 @@ class BedrockClaude:
                     return {"text": response_text}
 
             except Exception as e:
+                if not self._is_retryable(e):
+                    raise
                 last_error = e
                 if attempt < self.max_retries - 1:
-                    wait_time = self.retry_delay * (2 ** attempt)
-                    print(f"⚠️ Bedrock error (attempt {attempt + 1}/{self.max_retries}): {e}. Retrying in {wait_time}s...")
+                    wait_time = self._backoff_delay(attempt)
+                    logger.warning(f"⚠️ Bedrock error (attempt {attempt + 1}/{self.max_retries}): {e}. Retrying in {wait_time:.1f}s...")
                     time.sleep(wait_time)
                 else:
                     raise
@@ -385,23 +741,75 @@ class BedrockClaude:
         if last_error:
             raise last_error
 
+    def stream_claude(
+        self,
+        prompt: str,
+        system: Union[str, List[Dict[str, Any]]] = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.2
+    ) -> Iterator[str]:
+        """
+        Call Claude via Bedrock and yield the response text as it is generated
+
+        There is no retry once streaming has started; errors propagate to
+        the caller.
+
+        Args:
+            prompt: User message/prompt
+            system: System prompt (optional), string or list of text blocks
+            max_tokens: Maximum output tokens
+            temperature: Response temperature (0-1)
+
+        Yields:
+            Text deltas in order
+        """
+        if not self.client:
+            raise RuntimeError("Bedrock client not initialized. Check AWS credentials.")
+
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if system:
+            body["system"] = system
+
+        yield from self._iter_stream_text(json_dumps(body))
+
+    def _iter_stream_text(self, payload: bytes) -> Iterator[str]:
+        """Invoke Claude with response streaming and yield text deltas as they arrive"""
+        response = self.client.invoke_model_with_response_stream(
+            modelId=self.model_id,
+            body=payload
+        )
+
+        for event in response['body']:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+
+            data = json_loads(chunk['bytes'])
+            if data.get('type') == 'content_block_delta':
+                text = data['delta'].get('text')
+                if text:
+                    yield text
+            elif data.get('type') == 'message_delta' and data['delta'].get('stop_reason') == 'max_tokens':
+                logger.warning("⚠️ Claude response stopped at max_tokens, output is truncated")
+
+    def _stream_text(self, payload: bytes) -> str:
+        """Invoke Claude with response streaming and return the assembled text"""
+        return "".join(self._iter_stream_text(payload)).strip()
+
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """Parse JSON from Claude response, handling markdown code blocks"""
-        text = response_text.strip()
-
         # Remove markdown code blocks
-        if text.startswith('```json'):
-            text = text[7:]
-        if text.startswith('```'):
-            text = text[3:]
-        if text.endswith('```'):
-            text = text[:-3]
-        text = text.strip()
+        text = _JSON_FENCE_RE.match(response_text).group(1)
 
         try:
-            return json.loads(text)
+            return json_loads(text)
         except json.JSONDecodeError as e:
-            print(f"⚠️ JSON parse error: {e}")
+            logger.warning(f"⚠️ JSON parse error: {e}")
             # Try to repair truncated JSON
             return self._repair_json(text)
 
@@ -422,9 +830,9 @@ class BedrockClaude:
         repaired += '}' * max(0, open_braces)
 
         try:
-            return json.loads(repaired)
+            return json_loads(repaired)
         except json.JSONDecodeError:
-            print(f"❌ JSON repair failed")
+            logger.error(f"❌ JSON repair failed")
             return {"error": "Failed to parse response", "raw": text[:500]}
 
 
@@ -490,21 +898,21 @@ class BedrockCohereEmbeddings:
             try:
                 response = self.client.invoke_model(
                     modelId=self.model_id,
-                    body=json.dumps(body)
+                    body=json_dumps(body)
                 )
 
-                result = json.loads(response["body"].read())
+                result = json_loads(response["body"].read())
                 embeddings = result.get("embeddings", [])
 
                 if embeddings and len(embeddings) == len(batch):
                     all_embeddings.extend(embeddings)
-                    print(f"✅ Embedded batch {i // batch_size + 1}: {len(batch)} texts")
+                    logger.info(f"✅ Embedded batch {i // batch_size + 1}: {len(batch)} texts")
                 else:
-                    print(f"⚠️ Unexpected embedding result for batch {i // batch_size + 1}")
+                    logger.warning(f"⚠️ Unexpected embedding result for batch {i // batch_size + 1}")
                     all_embeddings.extend([[0.0] * self.embedding_dimension for _ in batch])
 
             except Exception as e:
-                print(f"❌ Embedding error for batch {i // batch_size + 1}: {e}")
+                logger.error(f"❌ Embedding error for batch {i // batch_size + 1}: {e}")
                 all_embeddings.extend([[0.0] * self.embedding_dimension for _ in batch])
 
         return all_embeddings
@@ -6,14 +6,24 @@ Native handling for CSV/XLSX spreadsheets.
 
 import os
 import httpx
+import shutil
 import tempfile
 import subprocess
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from text_chunker import SimpleDocument as Document
 
 DOCLING_URL = os.getenv("DOCLING_SERVICE_URL", "https://parsing.rapidrfp.ai")
 
+# One shared client for all Docling calls: httpx.post() builds a fresh
+# client (and SSL context, loading the CA bundle) on every call, and
+# throws away the connection afterwards
+_http_client = httpx.Client(timeout=None)
+
+# Upper bound on documents parsed at once by parse_documents_bulk
+DOCLING_MAX_WORKERS = int(os.getenv("DOCLING_MAX_WORKERS", "8"))
+
 # Strict format allowlist
 ALLOWED_FORMATS = {'.pdf', '.docx', '.doc', '.pptx', '.ppt', '.txt', '.xlsx', '.xls', '.csv'}
 PDF_CONVERTIBLE = {'.docx', '.doc', '.pptx', '.ppt'}
@@ -39,11 +49,18 @@ def validate_format(file_path: str) -> str:
 def convert_to_pdf(file_path: str) -> str:
     """Convert DOCX/PPTX to PDF using LibreOffice."""
     output_dir = tempfile.mkdtemp()
+    # Each conversion gets its own LibreOffice profile; soffice instances
+    # sharing the default profile can't run concurrently
+    profile_dir = tempfile.mkdtemp()
     cmd = [
-        'soffice', '--headless', '--convert-to', 'pdf',
+        'soffice', f'-env:UserInstallation=file://{profile_dir}',
+        '--headless', '--convert-to', 'pdf',
         '--outdir', output_dir, file_path
     ]
-    subprocess.run(cmd, check=True, timeout=120)
+    try:
+        subprocess.run(cmd, check=True, timeout=120)
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
     pdf_name = os.path.splitext(os.path.basename(file_path))[0] + '.pdf'
     return os.path.join(output_dir, pdf_name)
 
@@ -108,7 +125,7 @@ def parse_with_docling(pdf_path: str, original_filename: str) -> Dict[str, Any]:
         files = {"files": (os.path.basename(pdf_path), f, "application/pdf")}
         data = {"to_formats": ["json", "md"]}
 
-        response = httpx.post(
+        response = _http_client.post(
             f"{DOCLING_URL}/v1/convert/file",
             files=files,
             data=data,
@@ -196,3 +213,26 @@ def parse_document_with_docling(file_path: str, api_key: str = None) -> Dict[str
             temp_dir = os.path.dirname(temp_pdf)
             if os.path.exists(temp_dir) and not os.listdir(temp_dir):
                 os.rmdir(temp_dir)
+
+
+def parse_documents_bulk(file_paths: List[str], api_key: str = None) -> List[Dict[str, Any]]:
+    """
+    Parse several documents concurrently with parse_document_with_docling.
+
+    Each document is mostly waiting on LibreOffice or the Docling service,
+    so running them side by side overlaps that latency instead of stacking it.
+
+    Args:
+        file_paths: Paths to the document files
+        api_key: Unused, kept for compatibility with LlamaParse signature
+
+    Returns:
+        List of results (documents, page_count, document_count), in the
+        order of file_paths. The first failure is re-raised.
+    """
+    if not file_paths:
+        return []
+
+    max_workers = min(DOCLING_MAX_WORKERS, len(file_paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda path: parse_document_with_docling(path, api_key), file_paths))
@@ -4,20 +4,35 @@ Extracts metadata and submission requirements from RFP documents using AWS Bedro
 """
 
 import os
+import re
 import json
-import tempfile
+import copy
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from google.cloud import storage
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+from logging_utils import get_logger
+from bedrock_client import json_loads
+
+logger = get_logger(__name__)
 
 # Import Bedrock client for Claude AI
 try:
-    from bedrock_client import claude, BEDROCK_AVAILABLE
+    from bedrock_client import claude, BEDROCK_AVAILABLE, SUPPORTED_EXTENSIONS, MODEL_CONTEXT_TOKENS, CHARS_PER_TOKEN
 except ImportError:
     BEDROCK_AVAILABLE = False
     claude = None
-    print("⚠️ Bedrock client not available for document shredding")
+    SUPPORTED_EXTENSIONS = frozenset()
+    MODEL_CONTEXT_TOKENS = 200000
+    CHARS_PER_TOKEN = 3
+    logger.warning("⚠️ Bedrock client not available for document shredding")
 
 # For docx conversion
 try:
@@ -25,7 +40,27 @@ try:
     DOCX_AVAILABLE = True
 except ImportError:
     DOCX_AVAILABLE = False
-    print("⚠️ python-docx not installed. DOCX files will need conversion.")
+    logger.warning("⚠️ python-docx not installed. DOCX files will need conversion.")
+
+class FileInfo(BaseModel):
+    """A file in a shredding request"""
+    model_config = ConfigDict(frozen=True, coerce_numbers_to_str=True)
+
+    file_id: str
+    filename: str
+    # Forms s3_utils.parse_s3_url accepts: s3://, legacy gs://, and
+    # virtual-hosted (bucket.s3.region...) or path-style (s3.region...) S3 URLs
+    gcs_url: str = Field(pattern=r'^(s3://|gs://|https://([^/?#]+\.)?s3\.([a-z0-9-]+\.)?amazonaws\.com/)')
+
+
+_FILES_VALIDATOR = TypeAdapter(List[FileInfo])
+
+
+# Upper bound on concurrent downloads per shredding request
+MAX_DOWNLOAD_WORKERS = int(os.environ.get("SHRED_DOWNLOAD_WORKERS", "16"))
+
+# HTTP connection pool size for the shared GCS client
+GCS_POOL_SIZE = 32
 
 
 # Initialize storage client - now uses S3 by default
@@ -36,25 +71,31 @@ def get_s3_client():
 
 
 # Legacy GCS client for backward compatibility
+@functools.lru_cache(maxsize=1)
 def get_gcs_client():
-    """Get GCS client with proper credential handling (legacy)"""
+    """Get GCS client with proper credential handling (legacy, cached per process)"""
     cred_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "fire.json")
 
     if cred_path.startswith("{"):
         # JSON string from environment - parse and use credentials
-        cred_dict = json.loads(cred_path)
+        cred_dict = json_loads(cred_path)
         credentials = service_account.Credentials.from_service_account_info(cred_dict)
         client = storage.Client(credentials=credentials, project=os.environ.get("GOOGLE_CLOUD_PROJECT"))
-        print("✅ Using environment credentials for GCS bucket access")
+        logger.info("✅ Using environment credentials for GCS bucket access")
     else:
         # Fallback to file path or default credentials
         if os.path.exists(cred_path):
             credentials = service_account.Credentials.from_service_account_file(cred_path)
             client = storage.Client(credentials=credentials)
-            print(f"✅ Using credentials from {cred_path}")
+            logger.info(f"✅ Using credentials from {cred_path}")
         else:
             client = storage.Client()
-            print("✅ Using default credentials for GCS bucket access")
+            logger.info("✅ Using default credentials for GCS bucket access")
+
+    # Widen the connection pool so parallel downloads don't queue behind
+    # the default 10-socket pool
+    adapter = HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+    client._http.mount("https://", adapter)
 
     return client
 
@@ -72,50 +113,33 @@ def extract_text_from_docx(file_bytes: bytes) -> str:
     if not DOCX_AVAILABLE:
         raise ImportError("python-docx is required to process .docx files. Install with: pip install python-docx")
 
-    import io
-    doc = DocxDocument(io.BytesIO(file_bytes))
+    from bedrock_client import extract_docx_text
+    return extract_docx_text(file_bytes)
 
-    text_parts = []
 
-    # Extract text from paragraphs
-    for para in doc.paragraphs:
-        if para.text.strip():
-            text_parts.append(para.text)
-
-    # Extract text from tables
-    for table in doc.tables:
-        for row in table.rows:
-            row_text = []
-            for cell in row.cells:
-                if cell.text.strip():
-                    row_text.append(cell.text.strip())
-            if row_text:
-                text_parts.append(" | ".join(row_text))
-
-    return "\n\n".join(text_parts)
-
-
-def download_file_from_gcs(storage_url: str, temp_dir: str) -> tuple[str, str]:
+def download_file_bytes(storage_url: str) -> tuple[bytes, str]:
     """
-    Download a file from S3 or GCS to a temporary directory (backward compatible)
+    Download a file from S3 or GCS straight into memory (backward compatible)
 
     Args:
         storage_url: S3 URL (s3://bucket/path) or GCS URL (gs://bucket/path)
-        temp_dir: Temporary directory to save the file
 
     Returns:
-        Tuple of (local_file_path, filename)
+        Tuple of (file_bytes, filename)
     """
+    from s3_utils import download_file_from_s3, parse_s3_url
+
     # Handle S3 URLs
     if storage_url.startswith('s3://') or '.s3.' in storage_url or 's3.amazonaws.com' in storage_url:
-        from s3_utils import download_file_from_s3_to_temp
-        local_path, filename = download_file_from_s3_to_temp(storage_url, temp_dir)
-        print(f"✅ Downloaded {filename} from S3 to {local_path}")
-        return local_path, filename
+        _, key = parse_s3_url(storage_url)
+        filename = os.path.basename(key)
+        file_bytes = download_file_from_s3(storage_url)
+        logger.info(f"✅ Downloaded {filename} from S3")
+        return file_bytes, filename
 
     # Handle GCS URLs (legacy) - try S3 first
     if storage_url.startswith('gs://'):
-        from s3_utils import download_file_from_s3_to_temp, get_bucket_name
+        from s3_utils import get_bucket_name
 
         # Parse GCS URL
         parts = storage_url.replace('gs://', '').split('/', 1)
@@ -124,35 +148,202 @@ def download_file_from_gcs(storage_url: str, temp_dir: str) -> tuple[str, str]:
 
         # Try S3 first
         try:
-            s3_url = f"s3://{get_bucket_name()}/{file_path}"
-            local_path, filename = download_file_from_s3_to_temp(s3_url, temp_dir)
-            print(f"✅ Downloaded {filename} from S3 to {local_path}")
-            return local_path, filename
+            file_bytes = download_file_from_s3(f"s3://{get_bucket_name()}/{file_path}")
+            logger.info(f"✅ Downloaded {filename} from S3")
+            return file_bytes, filename
         except FileNotFoundError:
             # Fallback to GCS for legacy files
-            print(f"📦 File not in S3, trying GCS fallback...")
+            logger.info(f"📦 File not in S3, trying GCS fallback...")
             bucket_name = parts[0]
             gcs_client = get_gcs_client()
             bucket = gcs_client.bucket(bucket_name)
             blob = bucket.blob(file_path)
 
-            local_path = os.path.join(temp_dir, filename)
-            blob.download_to_filename(local_path)
-            print(f"✅ Downloaded {filename} from GCS (legacy) to {local_path}")
-            return local_path, filename
+            # Skip client-side CRC32C/MD5 hashing of the payload; the bytes
+            # only feed text extraction and a bad read fails there anyway
+            file_bytes = blob.download_as_bytes(checksum=None)
+            logger.info(f"✅ Downloaded {filename} from GCS (legacy)")
+            return file_bytes, filename
 
     raise ValueError(f"Invalid storage URL: {storage_url}. Expected s3:// or gs://")
 
 
-def prepare_shredding_prompt() -> str:
+def _file_extension(filename: str) -> str:
+    """Lower-cased extension without the dot ('' if there is none)"""
+    _, dot, ext = filename.rpartition('.')
+    return ext.lower() if dot else ''
+
+
+def _prepare_file(file_info: Dict[str, str]) -> Optional[tuple[List[Dict[str, Any]], str, str]]:
     """
-    Prepare the prompt for document analysis
+    Download a single file and convert it to Claude content blocks (runs in a worker thread)
+
+    Doing text extraction in the worker overlaps it with the remaining downloads.
+
+    Args:
+        file_info: File dictionary with 'filename' and 'gcs_url'
 
     Returns:
-        Formatted prompt string
+        Tuple of (content_blocks, filename, content_digest), or None if the file was skipped or failed
+    """
+    filename = file_info['filename']
+    gcs_url = file_info['gcs_url']
+
+    file_ext = _file_extension(filename)
+
+    # Skip formats Claude can't read (e.g. .doc) before downloading them
+    if file_ext not in SUPPORTED_EXTENSIONS:
+        logger.warning(f"⚠️ .{file_ext} format not supported. Please convert {filename} to .docx or .pdf")
+        return None
+
+    logger.info(f"📥 Downloading {filename} from GCS...")
+
+    try:
+        file_bytes, _ = download_file_bytes(gcs_url)
+        digest = hashlib.sha256(file_bytes).hexdigest()
+        content = claude.build_document_content(file_bytes, filename)
+        logger.debug("✅ Prepared %s for document processing (%d bytes)", filename, len(file_bytes))
+        return content, filename, digest
+
+    except Exception as e:
+        logger.error(f"❌ Error processing {filename}: {e}")
+        # Continue with other files
+        return None
+
+
+def _dedupe_prepared_files(
+    prepared_files: List[tuple[List[Dict[str, Any]], str, str]]
+) -> List[tuple[List[Dict[str, Any]], str]]:
     """
+    Drop files whose content is identical to an earlier file
 
-    prompt = """You are a specialized RFP Analyst. Your task is to extract structured metadata, pursuit details, production details, submission requirements, and a detailed compliance matrix from the provided RFP documents to initialize a project workspace.
+    The same attachment (e.g. a boilerplate form) is often uploaded under several
+    names; it is sent to Claude once, with a note listing the other names so
+    mentions can still cite them.
+
+    Args:
+        prepared_files: List of tuples (content_blocks, filename, content_digest)
+
+    Returns:
+        List of tuples (content_blocks, filename) with one entry per unique file
+    """
+    filenames_by_digest: Dict[str, List[str]] = {}
+    unique_files = []
+
+    for content, filename, digest in prepared_files:
+        if digest in filenames_by_digest:
+            filenames_by_digest[digest].append(filename)
+            logger.info(f"♻️ Skipping {filename}: identical to {filenames_by_digest[digest][0]}")
+            continue
+        filenames_by_digest[digest] = [filename]
+        unique_files.append((content, filename, digest))
+
+    deduped = []
+    for content, filename, digest in unique_files:
+        aliases = filenames_by_digest[digest][1:]
+        if aliases:
+            content = content + [{
+                "type": "text",
+                "text": f"\n(The document {filename} was also uploaded as: {', '.join(aliases)})\n"
+            }]
+        deduped.append((content, filename))
+
+    return deduped
+
+
+def _shred_cache_key(prepared_files: List[tuple[List[Dict[str, Any]], str, str]]) -> str:
+    """
+    Build the result-cache key for a set of prepared files
+
+    Filenames are part of the key because the extraction cites them as source_file.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(SHREDDING_PROMPT_VERSION.encode())
+    hasher.update((claude.model_id if claude else "").encode())
+    for digest, filename in sorted((digest, filename) for _, filename, digest in prepared_files):
+        hasher.update(f"\0{digest}\0{filename}".encode())
+    return hasher.hexdigest()
+
+
+def _get_redis_manager():
+    """Get the shared Redis manager, or None if Redis is unavailable"""
+    try:
+        from redis_manager import redis_manager
+        return redis_manager
+    except Exception as e:
+        logger.warning(f"⚠️ Redis unavailable for shredding cache: {e}")
+        return None
+
+
+# In-process LRU in front of the Redis shredding cache, so repeat shreds on
+# the same worker skip the Redis round trip (and still hit if Redis is down)
+SHRED_LOCAL_CACHE_SIZE = 256
+_shred_local_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_shred_local_cache_lock = threading.Lock()
+
+
+def _get_cached_shred_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Look up a shredding result in the local LRU, then in Redis"""
+    with _shred_local_cache_lock:
+        cached = _shred_local_cache.get(cache_key)
+        if cached is not None:
+            _shred_local_cache.move_to_end(cache_key)
+    if cached is not None:
+        # Callers may mutate the result; keep the cached copy pristine
+        return copy.deepcopy(cached)
+
+    redis = _get_redis_manager()
+    cached = redis.get_cached_shred_result(cache_key) if redis else None
+    if cached:
+        _remember_shred_result(cache_key, cached)
+    return cached
+
+
+def _remember_shred_result(cache_key: str, result: Dict[str, Any]):
+    """Store a private copy of a shredding result in the local LRU"""
+    result = copy.deepcopy(result)
+    with _shred_local_cache_lock:
+        _shred_local_cache[cache_key] = result
+        _shred_local_cache.move_to_end(cache_key)
+        while len(_shred_local_cache) > SHRED_LOCAL_CACHE_SIZE:
+            _shred_local_cache.popitem(last=False)
+
+
+def _cache_shred_result(cache_key: str, result: Dict[str, Any]):
+    """Store a shredding result in the local LRU and in Redis"""
+    _remember_shred_result(cache_key, result)
+    redis = _get_redis_manager()
+    if redis:
+        redis.cache_shred_result(cache_key, result)
+
+
+# Response budget for one shredding call, and headroom for per-file labels
+SHRED_MAX_OUTPUT_TOKENS = 32768
+SHRED_CONTEXT_MARGIN_TOKENS = 1024
+
+# Concurrent Claude calls per sharded request (kept low to avoid throttling)
+MAX_SHARD_WORKERS = 4
+
+# Rough text-equivalent size of one image block (~1.6k tokens)
+IMAGE_SIZE_ESTIMATE = 1600 * CHARS_PER_TOKEN
+
+# Categories allowed in compliance_matrix items; anything else becomes OTHER
+COMPLIANCE_CATEGORIES = frozenset({
+    'CERTIFICATION', 'EXPERIENCE', 'PERSONNEL', 'FORMAT',
+    'SUBMISSION', 'FINANCIAL', 'LEGAL', 'TECHNICAL', 'OTHER'
+})
+
+# Fields every shredding result section is normalized to contain
+PROJECT_METADATA_KEYS = ('project_name', 'issuer_name', 'due_date')
+PURSUIT_DETAIL_KEYS = ('customer_address', 'contact_info', 'final_approver', 'signer', 'source')
+PRODUCTION_DETAIL_KEYS = ('submission_format', 'file_requirements', 'print_requirements',
+                          'delivery_method', 'special_instructions', 'source')
+
+# Leading ```/```json and trailing ``` fences around a model response
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+# Static shredding prompt, built once at import
+SHREDDING_PROMPT = """You are a specialized RFP Analyst. Your task is to extract structured metadata, pursuit details, production details, submission requirements, and a detailed compliance matrix from the provided RFP documents to initialize a project workspace.
 
 INSTRUCTIONS:
 
@@ -392,7 +583,26 @@ OUTPUT FORMAT: Return ONLY the JSON object. No markdown code blocks, no conversa
 
 Now analyze the provided document(s) and extract the information according to these instructions."""
 
-    return prompt
+# Document budget per Claude call: the context window minus the response,
+# the prompt and a margin, at the conservative chars-per-token estimate
+MAX_SHARD_CHARS = int(os.environ.get(
+    "SHRED_MAX_SHARD_CHARS",
+    str((MODEL_CONTEXT_TOKENS - SHRED_MAX_OUTPUT_TOKENS - SHRED_CONTEXT_MARGIN_TOKENS) * CHARS_PER_TOKEN - len(SHREDDING_PROMPT))
+))
+
+
+def prepare_shredding_prompt() -> str:
+    """
+    Prepare the prompt for document analysis
+
+    Returns:
+        Formatted prompt string
+    """
+    return SHREDDING_PROMPT
+
+
+# Changes whenever the prompt does, invalidating cached shredding results
+SHREDDING_PROMPT_VERSION = hashlib.sha256(SHREDDING_PROMPT.encode()).hexdigest()[:16]
 
 
 def repair_truncated_json(json_text: str) -> Dict[str, Any]:
@@ -405,8 +615,6 @@ def repair_truncated_json(json_text: str) -> Dict[str, Any]:
     Returns:
         Parsed JSON dictionary with available data
     """
-    import re
-
     # Track open brackets and braces
     open_braces = 0
     open_brackets = 0
@@ -455,12 +663,12 @@ def repair_truncated_json(json_text: str) -> Dict[str, Any]:
     repaired += '}' * open_braces
 
     try:
-        result = json.loads(repaired)
-        print(f"✅ Successfully repaired truncated JSON")
+        result = json_loads(repaired)
+        logger.info(f"✅ Successfully repaired truncated JSON")
         return result
     except json.JSONDecodeError:
         # If still failing, try a more aggressive approach - extract what we can
-        print(f"⚠️ Could not fully repair JSON, extracting partial data...")
+        logger.warning(f"⚠️ Could not fully repair JSON, extracting partial data...")
         return extract_partial_json(json_text)
 
 
@@ -474,8 +682,6 @@ def extract_partial_json(json_text: str) -> Dict[str, Any]:
     Returns:
         Dictionary with extracted sections
     """
-    import re
-
     result = {
         'project_metadata': {'project_name': None, 'issuer_name': None, 'due_date': None},
         'pursuit_details': None,
@@ -488,7 +694,7 @@ def extract_partial_json(json_text: str) -> Dict[str, Any]:
     metadata_match = re.search(r'"project_metadata"\s*:\s*(\{[^}]+\})', json_text)
     if metadata_match:
         try:
-            result['project_metadata'] = json.loads(metadata_match.group(1))
+            result['project_metadata'] = json_loads(metadata_match.group(1))
         except:
             pass
 
@@ -500,7 +706,7 @@ def extract_partial_json(json_text: str) -> Dict[str, Any]:
             item_str = item_str.rstrip(',')
             if not item_str.endswith('}'):
                 item_str += '}'
-            item = json.loads(item_str)
+            item = json_loads(item_str)
             if item.get('id') and item.get('requirement_text'):
                 result['compliance_matrix'].append(item)
         except:
@@ -513,24 +719,124 @@ def extract_partial_json(json_text: str) -> Dict[str, Any]:
             item_str = item_str.rstrip(',')
             if not item_str.endswith('}'):
                 item_str += '}'
-            item = json.loads(item_str)
+            item = json_loads(item_str)
             if item.get('response_item_name'):
                 result['submission_requirements'].append(item)
         except:
             pass
 
-    print(f"📋 Extracted partial data: {len(result['compliance_matrix'])} compliance items, "
+    logger.info(f"📋 Extracted partial data: {len(result['compliance_matrix'])} compliance items, "
           f"{len(result['submission_requirements'])} submission requirements")
 
     return result
 
 
-def call_bedrock_for_shredding(files_data: List[tuple[bytes, str]]) -> Dict[str, Any]:
+def _content_size(content: List[Dict[str, Any]]) -> int:
+    """Approximate prompt size of content blocks, in characters of text"""
+    size = 0
+    for block in content:
+        if block.get("type") == "image":
+            size += IMAGE_SIZE_ESTIMATE
+        else:
+            size += len(block.get("text", ""))
+    return size
+
+
+def _shard_prepared_files(
+    prepared_files: List[tuple[List[Dict[str, Any]], str]],
+    max_chars: int = None
+) -> List[List[tuple[List[Dict[str, Any]], str]]]:
+    """
+    Greedily pack files, in order, into shards that fit one Claude call
+
+    A single file larger than the budget gets a shard of its own.
+    """
+    max_chars = max_chars or MAX_SHARD_CHARS
+    shards = []
+    current, current_size = [], 0
+
+    for prepared in prepared_files:
+        size = _content_size(prepared[0])
+        if current and current_size + size > max_chars:
+            shards.append(current)
+            current, current_size = [], 0
+        current.append(prepared)
+        current_size += size
+
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _first_present(values: List[Any]) -> Any:
+    """Return the first truthy value, or None"""
+    return next((value for value in values if value), None)
+
+
+def _merge_sections(sections: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Merge dict sections from several shards, keeping the first non-empty value per key"""
+    sections = [section for section in sections if isinstance(section, dict)]
+    if not sections:
+        return None
+
+    merged = {}
+    for section in sections:
+        for key, value in section.items():
+            if not merged.get(key) and value:
+                merged[key] = value
+            merged.setdefault(key, value)
+    return merged
+
+
+def _merge_shard_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge extraction results from several shards into one
+
+    Submission requirements with the same name are combined (mentions appended),
+    as the prompt's de-duplication rule asks; compliance items are renumbered.
+    """
+    merged = {
+        'project_metadata': _merge_sections([r.get('project_metadata') for r in results]),
+        'pursuit_details': _merge_sections([r.get('pursuit_details') for r in results]),
+        'production_details': _merge_sections([r.get('production_details') for r in results]),
+    }
+
+    requirements = []
+    requirements_by_name: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        for requirement in result.get('submission_requirements') or []:
+            name_key = (requirement.get('response_item_name') or '').strip().lower()
+            existing = requirements_by_name.get(name_key) if name_key else None
+            if existing is None:
+                # Nameless requirements can't be matched across shards, keep each one
+                if name_key:
+                    requirements_by_name[name_key] = requirement
+                requirements.append(requirement)
+                continue
+            existing['mentions'] = (existing.get('mentions') or []) + (requirement.get('mentions') or [])
+            existing['is_required'] = bool(existing.get('is_required') or requirement.get('is_required'))
+            existing['description'] = _first_present([existing.get('description'), requirement.get('description')])
+    merged['submission_requirements'] = requirements
+
+    compliance_matrix = []
+    for result in results:
+        compliance_matrix.extend(result.get('compliance_matrix') or [])
+    for idx, item in enumerate(compliance_matrix):
+        item['id'] = f"CM-{str(idx + 1).zfill(3)}"
+    merged['compliance_matrix'] = compliance_matrix
+
+    return merged
+
+
+def call_bedrock_for_shredding(prepared_files: List[tuple[List[Dict[str, Any]], str]]) -> Dict[str, Any]:
     """
     Call AWS Bedrock Claude to extract metadata and submission requirements using multimodal capabilities
 
+    Bundles too large for one context window are split into shards that are
+    extracted in parallel and merged.
+
     Args:
-        files_data: List of tuples (file_bytes, filename)
+        prepared_files: List of tuples (content_blocks, filename) from _prepare_file
 
     Returns:
         Parsed JSON response from Claude
@@ -538,45 +844,58 @@ def call_bedrock_for_shredding(files_data: List[tuple[bytes, str]]) -> Dict[str,
     if not BEDROCK_AVAILABLE or not claude:
         raise RuntimeError("Bedrock client not available. Check AWS credentials.")
 
-    try:
-        # Prepare the prompt
-        prompt = prepare_shredding_prompt()
+    shards = _shard_prepared_files(prepared_files)
+    if len(shards) == 1:
+        return _shred_shard(shards[0])
 
-        # Prepare documents for Claude's call_claude_with_documents method
-        documents = []
+    logger.info(f"📚 Bundle too large for one request, splitting {len(prepared_files)} files into {len(shards)} shards")
+    with ThreadPoolExecutor(max_workers=min(len(shards), MAX_SHARD_WORKERS)) as executor:
+        partial_results = list(executor.map(_shred_shard, shards))
 
-        for file_bytes, filename in files_data:
-            file_ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    return _merge_shard_results(partial_results)
 
-            # Handle .doc files (not supported)
-            if file_ext == "doc":
-                print(f"⚠️ .doc format not supported. Please convert {filename} to .docx or .pdf")
-                continue
 
-            documents.append((file_bytes, filename))
-            print(f"✅ Added {filename} for document processing ({len(file_bytes)} bytes)")
+def _shred_shard(prepared_files: List[tuple[List[Dict[str, Any]], str]]) -> Dict[str, Any]:
+    """
+    Run one Claude extraction over a set of prepared files
+
+    Args:
+        prepared_files: List of tuples (content_blocks, filename)
+
+    Returns:
+        Parsed JSON response from Claude
+    """
+    try:
+        # Prepare the prompt
+        prompt = prepare_shredding_prompt()
+
+        content = []
+        for file_content, _ in prepared_files:
+            content.extend(file_content)
 
-        if not documents:
+        if not content:
             raise Exception("No processable documents found")
 
-        print(f"🤖 Sending request to Bedrock Claude for document shredding ({len(documents)} files)...")
+        logger.info(f"🤖 Sending request to Bedrock Claude for document shredding ({len(prepared_files)} files)...")
 
-        # Call Claude with documents using Bedrock
-        response = claude.call_claude_with_documents(
+        # Call Claude with the prepared document content using Bedrock
+        response = claude.call_claude_with_content(
             prompt=prompt,
-            documents=documents,
-            max_tokens=32768,
+            content=content,
+            max_tokens=SHRED_MAX_OUTPUT_TOKENS,
             temperature=0.2,
-            response_format="json"
+            response_format="json",
+            stream=True,
+            prefill="{"
         )
 
-        print(f"✅ Received response from Bedrock Claude")
+        logger.info(f"✅ Received response from Bedrock Claude")
 
-        # Response is already parsed as JSON by call_claude_with_documents
+        # Response is already parsed as JSON by call_claude_with_content
         if isinstance(response, dict):
             # Check if there was an error parsing
             if 'error' in response and response['error'] == 'Failed to parse response':
-                print(f"⚠️ JSON parse error in response. Attempting to repair...")
+                logger.warning(f"⚠️ JSON parse error in response. Attempting to repair...")
                 raw_text = response.get('raw', '')
                 result = repair_truncated_json(raw_text)
             else:
@@ -584,35 +903,37 @@ def call_bedrock_for_shredding(files_data: List[tuple[bytes, str]]) -> Dict[str,
         else:
             # If response is a string, try to parse it
             response_text = str(response).strip()
-            print(f"📝 Raw response length: {len(response_text)} characters")
+            logger.debug("📝 Raw response length: %d characters", len(response_text))
 
             # Clean up response if needed (remove markdown code blocks)
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
+            response_text = _CODE_FENCE_RE.sub('', response_text).strip()
 
             # Try to parse JSON
             try:
-                result = json.loads(response_text)
+                result = json_loads(response_text)
             except json.JSONDecodeError as json_err:
-                print(f"⚠️ JSON parse error: {json_err}. Attempting to repair truncated JSON...")
+                logger.warning(f"⚠️ JSON parse error: {json_err}. Attempting to repair truncated JSON...")
                 result = repair_truncated_json(response_text)
 
-        print(f"✅ Successfully parsed JSON response")
+        logger.info(f"✅ Successfully parsed JSON response")
 
         return result
 
     except Exception as e:
-        print(f"❌ Error calling Bedrock Claude: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error calling Bedrock Claude: {e}")
         raise
 
 
+def _null_empty_fields(section: Optional[Dict[str, Any]], keys: tuple) -> Dict[str, Any]:
+    """Return section with every key present and empty values set to None"""
+    if not section:
+        return dict.fromkeys(keys)
+    for key in keys:
+        if not section.get(key):
+            section[key] = None
+    return section
+
+
 def shred_documents(files: List[Dict[str, str]], org_id: str) -> Dict[str, Any]:
     """
     Main function to shred RFP documents and extract metadata
@@ -625,156 +946,86 @@ def shred_documents(files: List[Dict[str, str]], org_id: str) -> Dict[str, Any]:
         Dictionary with project_metadata and submission_requirements
     """
 
-    print(f"📄 Starting document shredding for {len(files)} files...")
+    logger.info(f"📄 Starting document shredding for {len(files)} files...")
 
-    # Create temporary directory for downloads
-    temp_dir = tempfile.mkdtemp(prefix="rfp_shredding_")
+    if not BEDROCK_AVAILABLE or not claude:
+        raise RuntimeError("Bedrock client not available. Check AWS credentials.")
 
-    try:
-        # Step 1: Download all files from GCS and read as bytes
-        files_data = []
+    # Step 1: Download and extract all files concurrently, in memory
+    max_workers = max(1, min(MAX_DOWNLOAD_WORKERS, len(files)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        prepared = list(executor.map(_prepare_file, files))
 
-        for file_info in files:
-            filename = file_info['filename']
-            gcs_url = file_info['gcs_url']
+    prepared = [item for item in prepared if item is not None]
 
-            print(f"📥 Downloading {filename} from GCS...")
+    if not prepared:
+        raise Exception("No files could be processed")
 
-            try:
-                local_path, _ = download_file_from_gcs(gcs_url, temp_dir)
+    # Re-shredding the same files (UI retries, re-submissions) is served from cache
+    cache_key = _shred_cache_key(prepared)
+    cached = _get_cached_shred_result(cache_key)
+    if cached:
+        logger.info(f"⚡ Returning cached shredding result ({cache_key[:12]})")
+        return cached
 
-                # Read file as bytes
-                with open(local_path, 'rb') as f:
-                    file_bytes = f.read()
+    # Keep the original file order for the prompt, sending identical files once
+    prepared_files = _dedupe_prepared_files(prepared)
 
-                files_data.append((file_bytes, filename))
-                print(f"✅ Prepared {filename} for multimodal upload ({len(file_bytes)} bytes)")
+    # Step 2: Call Bedrock Claude with all files using multimodal input
+    result = call_bedrock_for_shredding(prepared_files)
 
-            except Exception as e:
-                print(f"❌ Error processing {filename}: {e}")
-                # Continue with other files
-                continue
+    # Step 3: Validate and return result
+    result['project_metadata'] = result.get('project_metadata') or dict.fromkeys(PROJECT_METADATA_KEYS)
+    result['pursuit_details'] = _null_empty_fields(result.get('pursuit_details'), PURSUIT_DETAIL_KEYS)
+    result['production_details'] = _null_empty_fields(result.get('production_details'), PRODUCTION_DETAIL_KEYS)
 
-        if not files_data:
-            raise Exception("No files could be processed")
-
-        # Step 2: Call Bedrock Claude with all files using multimodal input
-        result = call_bedrock_for_shredding(files_data)
-
-        # Step 3: Validate and return result
-        if not result.get('project_metadata'):
-            result['project_metadata'] = {
-                'project_name': None,
-                'issuer_name': None,
-                'due_date': None
-            }
-
-        # Validate pursuit_details structure
-        if not result.get('pursuit_details'):
-            result['pursuit_details'] = {
-                'customer_address': None,
-                'contact_info': None,
-                'final_approver': None,
-                'signer': None,
-                'source': None
-            }
-        else:
-            # Ensure all sub-fields exist
-            pursuit = result['pursuit_details']
-            if not pursuit.get('customer_address'):
-                pursuit['customer_address'] = None
-            if not pursuit.get('contact_info'):
-                pursuit['contact_info'] = None
-            if not pursuit.get('final_approver'):
-                pursuit['final_approver'] = None
-            if not pursuit.get('signer'):
-                pursuit['signer'] = None
-            if not pursuit.get('source'):
-                pursuit['source'] = None
-
-        # Validate production_details structure
-        if not result.get('production_details'):
-            result['production_details'] = {
-                'submission_format': None,
-                'file_requirements': None,
-                'print_requirements': None,
-                'delivery_method': None,
-                'special_instructions': None,
-                'source': None
-            }
-        else:
-            # Ensure all sub-fields exist
-            production = result['production_details']
-            if not production.get('submission_format'):
-                production['submission_format'] = None
-            if not production.get('file_requirements'):
-                production['file_requirements'] = None
-            if not production.get('print_requirements'):
-                production['print_requirements'] = None
-            if not production.get('delivery_method'):
-                production['delivery_method'] = None
-            if not production.get('special_instructions'):
-                production['special_instructions'] = None
-            if not production.get('source'):
-                production['source'] = None
-
-        if not result.get('submission_requirements'):
-            result['submission_requirements'] = []
-
-        # Validate compliance_matrix structure
-        if not result.get('compliance_matrix'):
-            result['compliance_matrix'] = []
-        else:
-            # Ensure each item has required fields
-            valid_categories = {'CERTIFICATION', 'EXPERIENCE', 'PERSONNEL', 'FORMAT',
-                              'SUBMISSION', 'FINANCIAL', 'LEGAL', 'TECHNICAL', 'OTHER'}
-            for idx, item in enumerate(result['compliance_matrix']):
-                # Ensure ID exists
-                if not item.get('id'):
-                    item['id'] = f"CM-{str(idx + 1).zfill(3)}"
-                # Ensure category is valid
-                if item.get('category', '').upper() not in valid_categories:
-                    item['category'] = 'OTHER'
-                else:
-                    item['category'] = item['category'].upper()
-                # Ensure required fields exist
-                if not item.get('requirement_text'):
-                    item['requirement_text'] = ''
-                if not item.get('source_section'):
-                    item['source_section'] = None
-                if not item.get('source_page'):
-                    item['source_page'] = None
-
-        # Log extraction summary
-        print(f"✅ Document shredding complete!")
-        print(f"   - Project Name: {result['project_metadata'].get('project_name')}")
-        print(f"   - Issuer: {result['project_metadata'].get('issuer_name')}")
-        print(f"   - Due Date: {result['project_metadata'].get('due_date')}")
-
-        # Log pursuit details
-        pursuit = result.get('pursuit_details', {})
-        contact = pursuit.get('contact_info') if pursuit else None
-        print(f"   - Contact: {contact.get('name') if contact else 'Not found'}")
-        print(f"   - Final Approver: {pursuit.get('final_approver', {}).get('name') if pursuit.get('final_approver') else 'Not found'}")
-        print(f"   - Signer: {pursuit.get('signer', {}).get('name') if pursuit.get('signer') else 'Not found'}")
-
-        # Log production details
-        production = result.get('production_details', {})
-        print(f"   - Submission Format: {production.get('submission_format') if production else 'Not found'}")
-
-        print(f"   - Submission Requirements Found: {len(result['submission_requirements'])}")
-        print(f"   - Compliance Matrix Items Found: {len(result['compliance_matrix'])}")
+    if not result.get('submission_requirements'):
+        result['submission_requirements'] = []
 
-        return result
+    # Validate compliance_matrix structure
+    if not result.get('compliance_matrix'):
+        result['compliance_matrix'] = []
+    else:
+        # Ensure each item has required fields
+        for idx, item in enumerate(result['compliance_matrix']):
+            # Ensure ID exists
+            if not item.get('id'):
+                item['id'] = f"CM-{str(idx + 1).zfill(3)}"
+            # Ensure category is valid
+            category = (item.get('category') or '').upper()
+            item['category'] = category if category in COMPLIANCE_CATEGORIES else 'OTHER'
+            # Ensure required fields exist
+            if not item.get('requirement_text'):
+                item['requirement_text'] = ''
+            if not item.get('source_section'):
+                item['source_section'] = None
+            if not item.get('source_page'):
+                item['source_page'] = None
+
+    # Log extraction summary
+    logger.info(f"✅ Document shredding complete!")
+    logger.info(f"   - Project Name: {result['project_metadata'].get('project_name')}")
+    logger.info(f"   - Issuer: {result['project_metadata'].get('issuer_name')}")
+    logger.info(f"   - Due Date: {result['project_metadata'].get('due_date')}")
+
+    # Log pursuit details (every key is present after validation)
+    pursuit = result['pursuit_details']
+    contact, approver, signer = pursuit['contact_info'], pursuit['final_approver'], pursuit['signer']
+    logger.info(f"   - Contact: {contact.get('name') if contact else 'Not found'}")
+    logger.info(f"   - Final Approver: {approver.get('name') if approver else 'Not found'}")
+    logger.info(f"   - Signer: {signer.get('name') if signer else 'Not found'}")
+
+    # Log production details
+    logger.info(f"   - Submission Format: {result['production_details']['submission_format']}")
+
+    logger.info(f"   - Submission Requirements Found: {len(result['submission_requirements'])}")
+    logger.info(f"   - Compliance Matrix Items Found: {len(result['compliance_matrix'])}")
+
+    # Don't pin an empty extraction for a week; a retry may do better
+    if result['submission_requirements'] or result['compliance_matrix']:
+        _cache_shred_result(cache_key, result)
 
-    finally:
-        # Clean up temporary directory
-        import shutil
-        try:
-            shutil.rmtree(temp_dir)
-            print(f"🧹 Cleaned up temporary directory: {temp_dir}")
-        except Exception as e:
-            print(f"⚠️ Could not clean up temp directory: {e}")
+    return result
 
 
 def shred_documents_endpoint_handler(request_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -804,12 +1055,24 @@ def shred_documents_endpoint_handler(request_data: Dict[str, Any]) -> Dict[str,
                 'error': 'Organization ID is required'
             }, 400
 
-        # Validate each file has required fields
+        # Validate each file has required fields and a storage URL
+        try:
+            files = [file_info.model_dump() for file_info in _FILES_VALIDATOR.validate_python(files)]
+        except ValidationError as e:
+            return {
+                'success': False,
+                'error': 'Each file must have file_id, filename, and gcs_url (s3://, gs:// or https://)',
+                'details': str(e)
+            }, 400
+
+        # Reject unsupported formats before paying for any download
         for file_info in files:
-            if not all(key in file_info for key in ['file_id', 'filename', 'gcs_url']):
+            file_ext = _file_extension(file_info['filename'])
+            if file_ext not in SUPPORTED_EXTENSIONS:
                 return {
                     'success': False,
-                    'error': 'Each file must have file_id, filename, and gcs_url'
+                    'error': f"Unsupported file type for {file_info['filename']}. "
+                             f"Supported: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"
                 }, 400
 
         # Perform document shredding
@@ -825,9 +1088,7 @@ def shred_documents_endpoint_handler(request_data: Dict[str, Any]) -> Dict[str,
         }, 200
 
     except Exception as e:
-        print(f"❌ Error in document shredding endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error in document shredding endpoint: {e}")
 
         return {
             'success': False,
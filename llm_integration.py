@@ -4,19 +4,267 @@ LLM integration for AWS Bedrock Claude
 Replaces OpenAI ChatGPT with Bedrock Claude for all LLM operations
 """
 import os
+import copy
+import time
+import functools
+import hashlib
+import threading
 import requests
-from typing import Dict, Any, Optional, List
+import json
+import numpy as np
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Iterator
 from dotenv import load_dotenv
+from logging_utils import get_logger
+from bedrock_client import json_loads, json_dumps
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# Shared HTTP session for backend calls, so the TCP/TLS connection is
+# reused across requests instead of reopened on every answer
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=["GET"])
+)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+
+# Concurrent Bedrock calls per generate_answers batch
+MAX_CONCURRENT_ANSWERS = int(os.getenv("LLM_MAX_CONCURRENT_ANSWERS", "8"))
+
+# Output budget for one packed multi-question call
+MAX_BATCH_OUTPUT_TOKENS = 32768
+
+# Headroom for the prompt wrapper when sizing retrieved context
+CONTEXT_MARGIN_TOKENS = 512
+
 # Import Bedrock client
 try:
-    from bedrock_client import claude, BEDROCK_AVAILABLE
+    from bedrock_client import claude, cohere_embeddings, BEDROCK_AVAILABLE, MODEL_CONTEXT_TOKENS, CHARS_PER_TOKEN
 except ImportError:
     BEDROCK_AVAILABLE = False
     claude = None
-    print("⚠️ Bedrock client not available for LLM integration")
+    cohere_embeddings = None
+    MODEL_CONTEXT_TOKENS = 200000
+    CHARS_PER_TOKEN = 3
+    logger.warning("⚠️ Bedrock client not available for LLM integration")
+
+# Semantic answer cache: paraphrased questions over the same retrieved
+# context reuse an earlier answer. Only low-temperature answers are cached,
+# since higher temperatures ask for varied output. Opt-in: at the similarity
+# threshold two distinct questions can still match and share an answer.
+SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_TEMPERATURE = 0.3
+
+
+# Static answering policy for RAG answers. It is sent as its own system
+# block ahead of the per-question context, byte-identical on every call, so
+# Bedrock prompt caching can reuse it as a prefix.
+POLICY_SYSTEM = """You are the AI assistant inside RapidRFP, an application that helps users provide accurate information about their products and services.
+
+Your job is to produce a clear, concise, professional, and compliant response based ONLY on the relevant text provided for this question.
+
+You must follow all rules exactly.
+
+CORE RULES
+    •    Use only the provided relevant text as your source of truth.
+If the text contradicts general knowledge, the text wins.
+    •    Do NOT invent or assume any facts that are not present in the provided text or in the context provided by the user.
+    •    You may use universally accepted common knowledge
+(e.g., dates, countries, broad definitions like "cloud computing"),
+but you may NOT add any company-specific, technical, or contextual information not found in the text.
+    •    Never fill information gaps with outside knowledge.
+Only clarify using the text + universal common knowledge.
+    •    Keep responses concise, direct, and proposal-ready.
+    •    Remove any irrelevant information, disclaimers, noise, or markup.
+    •    Do not include line numbers, artifacts, or references to the text itself.
+    •    Do not restate or summarize the entire text—only extract what is required to answer the question.
+    •    If there are conflicting statements in the text, choose the strictest and safest interpretation.
+
+WHEN INFORMATION IS MISSING
+
+If the relevant text does not contain enough information to answer the question, respond with:
+
+"I'm unable to answer this from the provided company knowledge. Please provide additional context or keywords so I can assist further.\""""
+
+SIMPLE_SYSTEM = "You are the AI assistant inside RapidRFP, an application that helps users provide accurate information about their products and services. Provide clear, concise, and professional responses."
+
+# Mark long static policy prefixes as cache checkpoints. Opt-in, since it
+# needs a model with Bedrock prompt caching (not e.g. Claude 3 Haiku)
+PROMPT_CACHING_ENABLED = os.getenv("BEDROCK_PROMPT_CACHING", "false").lower() == "true"
+
+# Claude only caches prefixes of 1024+ tokens; shorter ones are sent unmarked.
+# Counted at ~4 chars/token so a marked prefix is reliably over the minimum.
+PROMPT_CACHE_MIN_CHARS = 1024 * 4
+
+
+def _policy_block(text: str) -> Dict[str, Any]:
+    """System text block for a static policy prefix"""
+    block = {"type": "text", "text": text}
+    if PROMPT_CACHING_ENABLED and len(text) >= PROMPT_CACHE_MIN_CHARS:
+        block["cache_control"] = {"type": "ephemeral"}
+    return block
+
+
+# How long a chat prompt template fetched from the backend is reused
+PROMPT_TEMPLATE_TTL = int(os.getenv("PROMPT_TEMPLATE_TTL", "300"))
+
+
+@functools.lru_cache(maxsize=1)
+def _fetch_prompt_template(ttl_bucket: int) -> Optional[str]:
+    """
+    Fetch the chat prompt template from the backend API
+
+    Cached per ttl_bucket, so the backend is asked at most once per
+    PROMPT_TEMPLATE_TTL. A failed fetch is cached too, so an unreachable
+    backend doesn't add its timeout to every answer.
+
+    Returns:
+        The template (containing {context}), or None to use the fallback prompt
+    """
+    try:
+        backend_api_url = os.environ.get("BACKEND_API_URL", "http://localhost:8083")
+        response = _SESSION.get(f"{backend_api_url}/api/prompts/chat", timeout=5)
+        if response.status_code != 200:
+            raise Exception(f"API returned status {response.status_code}")
+        prompt_data = json_loads(response.content)
+        if not (prompt_data.get("success") and prompt_data.get("data", {}).get("prompt")):
+            raise Exception("Invalid API response format")
+        return prompt_data["data"]["prompt"]
+    except Exception as e:
+        logger.warning("⚠️ Failed to fetch prompt from API: %s, using fallback", e)
+        return None
+
+
+def get_prompt_template() -> Optional[str]:
+    """Get the backend chat prompt template, refreshed every PROMPT_TEMPLATE_TTL seconds"""
+    return _fetch_prompt_template(int(time.time() // PROMPT_TEMPLATE_TTL))
+
+
+def _build_context_system(prompt_template: str, context: str):
+    """
+    Build the system prompt from a template containing {context}
+
+    When {context} is at the end of the template, the static part before it
+    goes in its own block so it stays a reusable prefix; otherwise the
+    template is formatted into a single string.
+    """
+    head, marker, tail = prompt_template.rpartition("{context}")
+    if marker and head.strip() and not tail.strip():
+        try:
+            return [_policy_block(head.format()), {"type": "text", "text": context}]
+        except (KeyError, IndexError, ValueError):
+            pass
+    return prompt_template.format(context=context)
+
+
+def _fit_context(context: str, prompt: str, max_tokens: int) -> str:
+    """
+    Truncate retrieved context so the request fits the model context window
+
+    Args:
+        context: Retrieved context from documents
+        prompt: User prompt sent alongside the context
+        max_tokens: Tokens reserved for the response
+
+    Returns:
+        Context, cut at the end if it would overflow the window
+    """
+    budget_tokens = MODEL_CONTEXT_TOKENS - max_tokens - CONTEXT_MARGIN_TOKENS
+    budget_chars = max(0, budget_tokens * CHARS_PER_TOKEN - len(prompt))
+    if len(context) <= budget_chars:
+        return context
+
+    # Retrieved chunks are ranked best-first, so keep the head
+    logger.warning("⚠️ Context too long (%d chars), truncating to %d chars", len(context), budget_chars)
+    return context[:budget_chars]
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of answers keyed by query embedding similarity
+
+    Entries are grouped by a scope key (hash of the context, history and
+    generation settings), so a hit only ever reuses an answer produced from
+    identical inputs apart from the wording of the question.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_scopes: int = 512,
+        max_entries_per_scope: int = 32,
+        ttl: int = 3600
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_scopes = max_scopes
+        self.max_entries_per_scope = max_entries_per_scope
+        self.ttl = ttl
+        self._scopes: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def scope_key(*parts: Any) -> str:
+        """Hash the inputs an answer depends on (besides the question)"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            hasher.update(str(part).encode("utf-8"))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def embed(self, query: str) -> Optional[np.ndarray]:
+        """Unit-length query embedding, or None if embedding failed"""
+        try:
+            vector = np.asarray(self.embedder.get_query_embedding(query), dtype=np.float32)
+        except Exception as e:
+            logger.warning("⚠️ Semantic cache embedding failed: %s", e)
+            return None
+        norm = np.linalg.norm(vector)
+        # get_embeddings returns a zero vector on errors
+        return vector / norm if norm else None
+
+    def lookup(self, scope: str, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the stored answer most similar to vector if it clears the threshold"""
+        now = time.time()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if not entries:
+                return None
+            entries[:] = [entry for entry in entries if entry[2] > now]
+            if not entries:
+                del self._scopes[scope]
+                return None
+            self._scopes.move_to_end(scope)
+            vectors = np.stack([entry[0] for entry in entries])
+            similarities = vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return copy.deepcopy(entries[best][1])
+
+    def put(self, scope: str, vector: np.ndarray, answer: Dict[str, Any]):
+        """Store an answer under scope"""
+        with self._lock:
+            entries = self._scopes.setdefault(scope, [])
+            self._scopes.move_to_end(scope)
+            entries.append((vector, copy.deepcopy(answer), time.time() + self.ttl))
+            del entries[:-self.max_entries_per_scope]
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+
+
+_answer_cache = SemanticAnswerCache(cohere_embeddings) if SEMANTIC_CACHE_ENABLED and cohere_embeddings else None
 
 
 class BedrockLLMClient:
@@ -46,8 +294,7 @@ class BedrockLLMClient:
 
         # Try to parse as JSON first (most structured format)
         try:
-            import json
-            parsed = json.loads(conversation_history)
+            parsed = json_loads(conversation_history)
             if isinstance(parsed, list):
                 for msg in parsed:
                     if isinstance(msg, dict) and "role" in msg and "content" in msg:
@@ -101,6 +348,49 @@ class BedrockLLMClient:
 
         return messages
 
+    def _build_system_message(self, context: str):
+        """
+        Build the system prompt for an answer
+
+        Args:
+            context: Retrieved context from documents (may be empty)
+
+        Returns:
+            System prompt string, or a list of system text blocks
+        """
+        if not context:
+            # Simple mode without context
+            return SIMPLE_SYSTEM
+
+        # Prompt from the API (cached) with fallback
+        prompt_template = get_prompt_template()
+        if prompt_template:
+            try:
+                system_message = _build_context_system(prompt_template, context)
+                logger.info("✅ Using prompt from API")
+                return system_message
+            except Exception as e:
+                logger.warning("⚠️ Failed to format prompt from API: %s, using fallback", e)
+
+        return [
+            _policy_block(POLICY_SYSTEM),
+            {"type": "text", "text": f"Context:\n{context}"}
+        ]
+
+    def _build_prompt(self, query: str, conversation_history: str = "") -> str:
+        """Build the user prompt from conversation history and the current query"""
+        full_prompt = ""
+        if conversation_history:
+            history_messages = self._parse_conversation_history(conversation_history)
+            for msg in history_messages:
+                role_label = "Human" if msg["role"] == "user" else "Assistant"
+                full_prompt += f"{role_label}: {msg['content']}\n\n"
+            logger.debug("📝 Added %d messages from conversation history", len(history_messages))
+
+        # Add current query
+        full_prompt += f"Human: {query}\n\nAssistant:"
+        return full_prompt
+
     def generate_answer(
         self,
         query: str,
@@ -122,75 +412,23 @@ class BedrockLLMClient:
         Returns:
             Dictionary with answer and metadata
         """
-        print(f"🤖 Generating answer with Bedrock Claude for: '{query[:100]}...'")
-        print(f"📝 Context length: {len(context)} chars")
-        print(f"💬 Conversation history length: {len(conversation_history)} chars")
+        logger.info("🤖 Generating answer with Bedrock Claude for: '%.100s...'", query)
+        full_prompt = self._build_prompt(query, conversation_history)
+        context = _fit_context(context, full_prompt, max_tokens)
+        logger.debug("📝 Context length: %d chars", len(context))
+        logger.debug("💬 Conversation history length: %d chars", len(conversation_history))
+
+        cache_scope = cache_vector = None
+        if _answer_cache and temperature <= SEMANTIC_CACHE_MAX_TEMPERATURE:
+            cache_scope = _answer_cache.scope_key(self.model, context, conversation_history, max_tokens, temperature)
+            cache_vector = _answer_cache.embed(query)
+            cached = _answer_cache.lookup(cache_scope, cache_vector) if cache_vector is not None else None
+            if cached:
+                logger.info("⚡ Returning semantically cached answer")
+                return {**cached, "query": query, "cached": True}
 
         try:
-            # Build the system prompt
-            if context:
-                # Fetch prompt from API with fallback
-                try:
-                    backend_api_url = os.environ.get("BACKEND_API_URL", "http://localhost:8083")
-                    response = requests.get(f"{backend_api_url}/api/prompts/chat", timeout=5)
-                    if response.status_code == 200:
-                        prompt_data = response.json()
-                        if prompt_data.get("success") and prompt_data.get("data", {}).get("prompt"):
-                            # Use prompt from API and format with context
-                            prompt_template = prompt_data["data"]["prompt"]
-                            system_message = prompt_template.format(context=context)
-                            print("✅ Using prompt from API")
-                        else:
-                            raise Exception("Invalid API response format")
-                    else:
-                        raise Exception(f"API returned status {response.status_code}")
-                except Exception as e:
-                    print(f"⚠️ Failed to fetch prompt from API: {e}, using fallback")
-                    # Fallback prompt
-                    system_message = f"""You are the AI assistant inside RapidRFP, an application that helps users provide accurate information about their products and services.
-
-Your job is to produce a clear, concise, professional, and compliant response based ONLY on the relevant text provided for this question.
-
-You must follow all rules exactly.
-
-CORE RULES
-    •    Use only the provided relevant text as your source of truth.
-If the text contradicts general knowledge, the text wins.
-    •    Do NOT invent or assume any facts that are not present in the provided text or in the context provided by the user.
-    •    You may use universally accepted common knowledge
-(e.g., dates, countries, broad definitions like "cloud computing"),
-but you may NOT add any company-specific, technical, or contextual information not found in the text.
-    •    Never fill information gaps with outside knowledge.
-Only clarify using the text + universal common knowledge.
-    •    Keep responses concise, direct, and proposal-ready.
-    •    Remove any irrelevant information, disclaimers, noise, or markup.
-    •    Do not include line numbers, artifacts, or references to the text itself.
-    •    Do not restate or summarize the entire text—only extract what is required to answer the question.
-    •    If there are conflicting statements in the text, choose the strictest and safest interpretation.
-
-WHEN INFORMATION IS MISSING
-
-If the relevant text does not contain enough information to answer the question, respond with:
-
-"I'm unable to answer this from the provided company knowledge. Please provide additional context or keywords so I can assist further."
-
-Context:
-{context}"""
-            else:
-                # Simple mode without context
-                system_message = "You are the AI assistant inside RapidRFP, an application that helps users provide accurate information about their products and services. Provide clear, concise, and professional responses."
-
-            # Build the prompt with conversation history
-            full_prompt = ""
-            if conversation_history:
-                history_messages = self._parse_conversation_history(conversation_history)
-                for msg in history_messages:
-                    role_label = "Human" if msg["role"] == "user" else "Assistant"
-                    full_prompt += f"{role_label}: {msg['content']}\n\n"
-                print(f"📝 Added {len(history_messages)} messages from conversation history")
-
-            # Add current query
-            full_prompt += f"Human: {query}\n\nAssistant:"
+            system_message = self._build_system_message(context)
 
             # Call Bedrock Claude
             result = claude.call_claude(
@@ -202,10 +440,10 @@ Context:
             )
 
             answer = result.get("text", "").strip()
-            print(f"✅ Generated answer: {len(answer)} chars")
-            print(f"📋 Answer preview: {answer[:150]}...")
+            logger.info("✅ Generated answer: %d chars", len(answer))
+            logger.debug("📋 Answer preview: %.150s...", answer)
 
-            return {
+            response = {
                 "success": True,
                 "answer": answer,
                 "query": query,
@@ -217,16 +455,219 @@ Context:
                     "temperature": temperature
                 }
             }
+            if cache_vector is not None and answer:
+                _answer_cache.put(cache_scope, cache_vector, response)
+            return response
 
         except Exception as e:
             error_msg = f"Bedrock Claude generation error: {str(e)}"
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return {
                 "success": False,
                 "error": error_msg,
                 "query": query
             }
 
+    def generate_answer_stream(
+        self,
+        query: str,
+        context: str = "",
+        conversation_history: str = "",
+        max_tokens: int = 4096,
+        temperature: float = 0.7
+    ) -> Iterator[str]:
+        """
+        Stream an answer using Bedrock Claude with optional context (RAG)
+
+        Same prompt as generate_answer, but yields text as Claude generates
+        it so callers can start rendering or forwarding before it finishes.
+
+        Args:
+            query: User question
+            context: Retrieved context from documents
+            conversation_history: Previous conversation in format "user: ...\nassistant: ...\n"
+            max_tokens: Maximum response tokens
+            temperature: Sampling temperature
+
+        Yields:
+            Answer text chunks in order
+        """
+        logger.info("🤖 Streaming answer with Bedrock Claude for: '%.100s...'", query)
+
+        prompt = self._build_prompt(query, conversation_history)
+        yield from claude.stream_claude(
+            prompt=prompt,
+            system=self._build_system_message(_fit_context(context, prompt, max_tokens)),
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+
+    def generate_answers(
+        self,
+        items: List[Dict[str, str]],
+        max_workers: int = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate answers for several questions concurrently
+
+        Each answer is an independent Bedrock call that mostly waits on the
+        network, so running them on a thread pool overlaps that latency.
+
+        Args:
+            items: List of dicts with 'query' and optional 'context' / 'conversation_history'
+            max_workers: Concurrent calls (defaults to MAX_CONCURRENT_ANSWERS)
+            **kwargs: Passed to generate_answer (max_tokens, temperature)
+
+        Returns:
+            List of generate_answer results, in the order of items
+        """
+        if not items:
+            return []
+
+        def answer(item: Dict[str, str]) -> Dict[str, Any]:
+            return self.generate_answer(
+                item["query"],
+                item.get("context", ""),
+                item.get("conversation_history", ""),
+                **kwargs
+            )
+
+        workers = max(1, min(max_workers or MAX_CONCURRENT_ANSWERS, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(answer, items))
+
+    def generate_answers_batch(
+        self,
+        items: List[Dict[str, str]],
+        batch_size: int = 8,
+        max_tokens: int = 4096,
+        temperature: float = 0.2
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many questions with few Claude calls by packing them per context
+
+        Questions that share the same retrieved context are sent together
+        (up to batch_size per call) and answered as one JSON array, so the
+        context is only sent once. Items with conversation history, and any
+        question missing from a batch response, are answered individually.
+
+        Args:
+            items: List of dicts with 'query' and optional 'context' / 'conversation_history'
+            batch_size: Maximum questions per Claude call
+            max_tokens: Maximum response tokens per answer
+            temperature: Sampling temperature
+
+        Returns:
+            List of generate_answer-style results, in the order of items
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+        # Group batchable questions by identical context
+        groups: Dict[str, List[int]] = {}
+        single = []
+        for idx, item in enumerate(items):
+            if item.get("conversation_history"):
+                single.append(idx)
+            else:
+                groups.setdefault(item.get("context", ""), []).append(idx)
+
+        batches = [
+            (context, indexes[i:i + batch_size])
+            for context, indexes in groups.items()
+            for i in range(0, len(indexes), batch_size)
+        ]
+
+        def run_batch(batch) -> List[int]:
+            context, indexes = batch
+            answers = self._answer_question_batch([items[i]["query"] for i in indexes], context, max_tokens, temperature)
+            missing = []
+            for position, idx in enumerate(indexes):
+                answer = answers.get(position)
+                if answer is None:
+                    missing.append(idx)
+                    continue
+                results[idx] = {
+                    "success": True,
+                    "answer": answer,
+                    "query": items[idx]["query"],
+                    "context_used": len(context) > 0,
+                    "context_length": len(context),
+                    "model": self.model,
+                    "batched": True,
+                    "parameters": {
+                        "max_tokens": max_tokens,
+                        "temperature": temperature
+                    }
+                }
+            return missing
+
+        if batches:
+            workers = max(1, min(MAX_CONCURRENT_ANSWERS, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for missing in executor.map(run_batch, batches):
+                    single.extend(missing)
+
+        if single:
+            single.sort()
+            answers = self.generate_answers([items[i] for i in single], max_tokens=max_tokens, temperature=temperature)
+            for idx, answer in zip(single, answers):
+                results[idx] = answer
+
+        return results
+
+    def _answer_question_batch(
+        self,
+        questions: List[str],
+        context: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Dict[int, str]:
+        """
+        Answer several questions over one context in a single Claude call
+
+        Returns:
+            Dict of question position -> answer; positions missing from the
+            response (or all of them, if it can't be parsed) are left out
+        """
+        logger.info("🤖 Generating %d batched answers with Bedrock Claude", len(questions))
+        numbered = [{"id": i, "question": question} for i, question in enumerate(questions)]
+        prompt = (
+            "Answer each of the following questions independently, following all of the rules above.\n\n"
+            f"Questions (JSON):\n{json_dumps(numbered).decode()}\n\n"
+            'Respond with ONLY a JSON array, one entry per question: [{"id": <id>, "answer": "<answer>"}]'
+        )
+
+        batch_max_tokens = min(max_tokens * len(questions), MAX_BATCH_OUTPUT_TOKENS)
+        try:
+            # Prefill "[" so Claude can't open with a preamble, and stream since
+            # the packed response can run to MAX_BATCH_OUTPUT_TOKENS
+            result = claude.call_claude_with_content(
+                prompt=prompt,
+                content=[],
+                system=self._build_system_message(_fit_context(context, prompt, batch_max_tokens)),
+                max_tokens=batch_max_tokens,
+                temperature=temperature,
+                response_format="json",
+                stream=True,
+                prefill="["
+            )
+        except Exception as e:
+            logger.warning("⚠️ Batched generation failed, answering individually: %s", e)
+            return {}
+
+        if not isinstance(result, list):
+            logger.warning("⚠️ Batched response was not a JSON array, answering individually")
+            return {}
+
+        answers = {}
+        for entry in result:
+            if isinstance(entry, dict) and isinstance(entry.get("id"), int) and isinstance(entry.get("answer"), str):
+                if 0 <= entry["id"] < len(questions) and entry["answer"].strip():
+                    answers[entry["id"]] = entry["answer"].strip()
+        logger.info("✅ Batched answers: %d/%d", len(answers), len(questions))
+        return answers
+
     def simple_generate(
         self,
         prompt: str,
@@ -244,7 +685,7 @@ Context:
         Returns:
             Dictionary with response and metadata
         """
-        print(f"🔤 Simple generation with Bedrock Claude for: '{prompt[:100]}...'")
+        logger.info("🔤 Simple generation with Bedrock Claude for: '%.100s...'", prompt)
 
         try:
             result = claude.call_claude(
@@ -255,7 +696,7 @@ Context:
             )
 
             response_text = result.get("text", "").strip()
-            print(f"✅ Generated response: {len(response_text)} chars")
+            logger.info("✅ Generated response: %d chars", len(response_text))
 
             return {
                 "success": True,
@@ -270,7 +711,7 @@ Context:
 
         except Exception as e:
             error_msg = f"Bedrock Claude generation error: {str(e)}"
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return {
                 "success": False,
                 "error": error_msg,
@@ -322,13 +763,22 @@ ChatGPTLLMClient = BedrockLLMClient
 
 
 # Convenience functions
+@functools.lru_cache(maxsize=1)
+def _default_client() -> BedrockLLMClient:
+    """Shared client for the convenience functions (not cached if construction fails)"""
+    return BedrockLLMClient()
+
+
 def generate_rag_answer(query: str, context: str = "", conversation_history: str = "", **kwargs) -> Dict[str, Any]:
     """Generate RAG answer using Bedrock Claude"""
-    client = BedrockLLMClient()
-    return client.generate_answer(query, context, conversation_history, **kwargs)
+    return _default_client().generate_answer(query, context, conversation_history, **kwargs)
+
+
+def generate_rag_answers(items: List[Dict[str, str]], **kwargs) -> List[Dict[str, Any]]:
+    """Generate RAG answers for several questions concurrently using Bedrock Claude"""
+    return _default_client().generate_answers(items, **kwargs)
 
 
 def generate_simple_response(prompt: str, **kwargs) -> Dict[str, Any]:
     """Generate simple response using Bedrock Claude"""
-    client = BedrockLLMClient()
-    return client.simple_generate(prompt, **kwargs)
+    return _default_client().simple_generate(prompt, **kwargs)
@@ -0,0 +1,82 @@
+"""
+Process-wide logging setup.
+Records are handed to a queue and written to stdout by a background listener
+thread, so request and worker threads never block on the stdout lock.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+
+def _get_queue_handler() -> logging.Handler:
+    """Start the background listener once and return the shared queue handler"""
+    global _queue_handler
+    with _setup_lock:
+        if _queue_handler is None:
+            log_queue = queue.SimpleQueue()
+
+            stream_handler = logging.StreamHandler(sys.stdout)
+            # Messages already carry their emoji prefixes, keep output identical to print()
+            stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+            listener = logging.handlers.QueueListener(log_queue, stream_handler)
+            listener.start()
+            atexit.register(listener.stop)
+
+            _queue_handler = logging.handlers.QueueHandler(log_queue)
+    return _queue_handler
+
+
+def _reset_after_fork() -> None:
+    """
+    Write straight to stdout in a forked child
+
+    The listener thread isn't copied by fork, so records put on the
+    inherited queue would never be written. Swap the queue handler for a
+    plain stream handler; a later get_logger call starts a fresh listener.
+    """
+    global _queue_handler, _setup_lock
+    _setup_lock = threading.Lock()
+    old_handler, _queue_handler = _queue_handler, None
+    if old_handler is None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger) and old_handler in logger.handlers:
+            logger.removeHandler(old_handler)
+            logger.addHandler(stream_handler)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger that writes through the shared background queue
+
+    Args:
+        name: Logger name (usually __name__)
+
+    Returns:
+        Configured logger
+    """
+    logger = logging.getLogger(name)
+    handler = _get_queue_handler()
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
@@ -202,6 +202,41 @@ class RedisManager:
             print(f"❌ Failed to get cached embedding: {e}")
             return None
     
+    def cache_shred_result(self, cache_key: str, result: Dict, ttl: int = 604800):
+        """Cache a document shredding result with TTL (default 7 days)"""
+        if not self.is_connected():
+            return False
+            
+        try:
+            key = f"shred:{cache_key}"
+            self.redis_client.setex(
+                key,
+                ttl,
+                json.dumps(result)
+            )
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to cache shred result: {e}")
+            return False
+    
+    def get_cached_shred_result(self, cache_key: str) -> Optional[Dict]:
+        """Get cached document shredding result"""
+        if not self.is_connected():
+            return None
+            
+        try:
+            key = f"shred:{cache_key}"
+            data = self.redis_client.get(key)
+            
+            if data:
+                return json.loads(data)
+            return None
+            
+        except Exception as e:
+            print(f"❌ Failed to get cached shred result: {e}")
+            return None
+    
     def set_task_result(self, task_id: str, result: Dict, ttl: int = 3600):
         """Store task result with TTL"""
         if not self.is_connected():
@@ -4,27 +4,66 @@ Replaces Google Cloud Storage functions.
 """
 
 import boto3
+import io
 import os
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from typing import Optional, Tuple
 import tempfile
 
 
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+# Objects above the threshold are fetched as parallel ranged GETs
+DOWNLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=int(os.getenv('S3_DOWNLOAD_CONCURRENCY', '10'))
+)
+
+
+def _s3_client_config() -> Config:
+    """botocore config for the shared S3 client"""
+    # Parallel file downloads (each with its own ranged GETs) share one
+    # client; the botocore default pool is 10
+    max_pool_connections = int(os.getenv('S3_MAX_CONNECTIONS', '64'))
+    try:
+        # botocore >= 1.36 checksums every downloaded byte by default; TLS
+        # already covers transport integrity for our reads
+        return Config(max_pool_connections=max_pool_connections,
+                      response_checksum_validation='when_required')
+    except TypeError:
+        return Config(max_pool_connections=max_pool_connections)
+
+
 def get_s3_client():
     """
-    Initialize S3 client with credentials from environment.
+    Get the shared S3 client, initializing it with credentials from environment.
+
+    boto3 clients are thread-safe, but creating them concurrently from the
+    default session is not, so one client is built under a lock and reused
+    by every caller (including parallel download threads).
 
     Environment variables required:
     - AWS_ACCESS_KEY_ID
     - AWS_SECRET_ACCESS_KEY
     - AWS_REGION (optional, defaults to us-east-1)
     """
-    return boto3.client(
-        's3',
-        region_name=os.getenv('AWS_REGION', 'us-east-1'),
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-    )
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client(
+                    's3',
+                    region_name=os.getenv('AWS_REGION', 'us-east-1'),
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                    config=_s3_client_config()
+                )
+    return _s3_client
 
 
 def get_bucket_name() -> str:
@@ -95,11 +134,33 @@ def download_file_from_s3(s3_url: str) -> bytes:
     s3_client = get_s3_client()
 
     try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        return response['Body'].read()
+        # Small objects (the common case) come back from this one ranged GET;
+        # download_fileobj would HEAD the object first
+        try:
+            response = s3_client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes=0-{DOWNLOAD_TRANSFER_CONFIG.multipart_threshold - 1}"
+            )
+        except ClientError as e:
+            # Ranged GETs of empty objects are rejected as unsatisfiable
+            if e.response.get('Error', {}).get('Code') == 'InvalidRange':
+                return b''
+            raise
+
+        content_range = response.get('ContentRange')
+        total_size = int(content_range.rsplit('/', 1)[1]) if content_range else None
+        if total_size is None or total_size <= DOWNLOAD_TRANSFER_CONFIG.multipart_threshold:
+            return response['Body'].read()
+
+        # Large objects are split into ranged GETs run concurrently
+        response['Body'].close()
+        buffer = io.BytesIO()
+        s3_client.download_fileobj(bucket, key, buffer, Config=DOWNLOAD_TRANSFER_CONFIG)
+        return buffer.getvalue()
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-        if error_code == 'NoSuchKey':
+        if error_code == '404' or error_code == 'NoSuchKey':
             raise FileNotFoundError(f"File not found in S3: {s3_url}")
         raise
 
@@ -5,21 +5,35 @@ Tests the complete flow from document upload to search
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
+import io
 import json
-import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Configuration
 MAIN_SERVER_URL = "http://localhost:5000"
 NODERAG_SERVICE_URL = "http://localhost:5001"
 
+# One connection pool for every call in the run (uploads and searches run concurrently)
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# File IDs unique to this run, so documents left by earlier runs can't satisfy the checks
+RUN_ID = uuid.uuid4().hex[:8]
+FILE_IDS = {
+    "v1": f"test_file_v1_{RUN_ID}",
+    "v2": f"test_file_v2_{RUN_ID}"
+}
+
 def test_health_checks():
     """Test health endpoints"""
     print("🩺 Testing health checks...")
     
     # Test NodeRAG service health
     try:
-        response = requests.get(f"{NODERAG_SERVICE_URL}/api/v1/health", timeout=5)
+        response = SESSION.get(f"{NODERAG_SERVICE_URL}/api/v1/health", timeout=5)
         if response.status_code == 200:
             print("✅ NodeRAG service is healthy")
         else:
@@ -44,42 +58,34 @@ def test_document_upload_v1():
     NodeRAG is an advanced graph-based retrieval augmented generation system.
     """
     
-    test_file_path = "/tmp/test_document_v1.txt"
-    with open(test_file_path, "w") as f:
-        f.write(test_content)
-    
+    files = {"file": ("test_document_v1.txt", io.BytesIO(test_content.encode()), "text/plain")}
+    data = {
+        "orgId": "test_org_123",
+        "fileId": FILE_IDS["v1"],
+        "userId": "test_user_789",
+        "ragversion": "v1"
+    }
+
     try:
-        with open(test_file_path, "rb") as f:
-            files = {"file": f}
-            data = {
-                "orgId": "test_org_123",
-                "fileId": "test_file_v1_456", 
-                "userId": "test_user_789",
-                "ragversion": "v1"
-            }
-            
-            response = requests.post(
-                f"{MAIN_SERVER_URL}/api/v3/upload",
-                files=files,
-                data=data,
-                timeout=30
-            )
-            
-            if response.status_code == 202:
-                result = response.json()
-                print(f"✅ V1 upload successful: {result['message']}")
-                print(f"   Processing method: {result['processing_method']}")
-                return True
-            else:
-                print(f"❌ V1 upload failed: {response.status_code} - {response.text}")
-                return False
-                
+        response = SESSION.post(
+            f"{MAIN_SERVER_URL}/api/v3/upload",
+            files=files,
+            data=data,
+            timeout=30
+        )
+
+        if response.status_code == 202:
+            result = response.json()
+            print(f"✅ V1 upload successful: {result['message']}")
+            print(f"   Processing method: {result['processing_method']}")
+            return True
+        else:
+            print(f"❌ V1 upload failed: {response.status_code} - {response.text}")
+            return False
+
     except Exception as e:
         print(f"❌ V1 upload error: {e}")
         return False
-    finally:
-        if os.path.exists(test_file_path):
-            os.unlink(test_file_path)
 
 def test_document_upload_v2():
     """Test v2 (NodeRAG) document upload"""
@@ -115,48 +121,69 @@ def test_document_upload_v2():
     - Multi-modal knowledge representation
     """
     
-    test_file_path = "/tmp/test_document_v2.txt"
-    with open(test_file_path, "w") as f:
-        f.write(test_content)
-    
+    files = {"file": ("test_document_v2.txt", io.BytesIO(test_content.encode()), "text/plain")}
+    data = {
+        "orgId": "test_org_123",
+        "fileId": FILE_IDS["v2"],
+        "userId": "test_user_789",
+        "ragversion": "v2"
+    }
+
     try:
-        with open(test_file_path, "rb") as f:
-            files = {"file": f}
-            data = {
-                "orgId": "test_org_123",
-                "fileId": "test_file_v2_456",
-                "userId": "test_user_789", 
-                "ragversion": "v2"
-            }
-            
-            response = requests.post(
-                f"{MAIN_SERVER_URL}/api/v3/upload",
-                files=files,
-                data=data,
-                timeout=30
-            )
-            
-            if response.status_code == 202:
-                result = response.json()
-                print(f"✅ V2 upload successful: {result['message']}")
-                print(f"   Processing method: {result['processing_method']}")
-                return True
-            else:
-                print(f"❌ V2 upload failed: {response.status_code} - {response.text}")
-                return False
-                
+        response = SESSION.post(
+            f"{MAIN_SERVER_URL}/api/v3/upload",
+            files=files,
+            data=data,
+            timeout=30
+        )
+
+        if response.status_code == 202:
+            result = response.json()
+            print(f"✅ V2 upload successful: {result['message']}")
+            print(f"   Processing method: {result['processing_method']}")
+            return True
+        else:
+            print(f"❌ V2 upload failed: {response.status_code} - {response.text}")
+            return False
+
     except Exception as e:
         print(f"❌ V2 upload error: {e}")
         return False
-    finally:
-        if os.path.exists(test_file_path):
-            os.unlink(test_file_path)
 
-def wait_for_processing():
-    """Wait for processing to complete"""
+def is_indexed(version):
+    """Check whether this run's document for a version shows up in search results"""
+    search_data = {
+        "query": "NodeRAG",
+        "orgId": "test_org_123",
+        "fileIds": [FILE_IDS[version]],
+        "top_k": 5,
+        "ragversion": version
+    }
+    response = SESSION.post(f"{MAIN_SERVER_URL}/api/v3/search", json=search_data, timeout=10)
+    if response.status_code != 200:
+        return False
+    results = response.json().get('combined_results', [])
+    return any(res.get('file_id') == FILE_IDS[version] for res in results)
+
+def wait_for_processing(versions=("v1", "v2"), timeout=30, interval=1):
+    """Wait until this run's uploaded documents are searchable, or until timeout"""
     print("⏳ Waiting for processing to complete...")
-    time.sleep(30)  # Give time for processing
-    print("✅ Processing wait complete")
+    deadline = time.time() + timeout
+    pending = set(versions)
+
+    while time.time() < deadline:
+        for version in list(pending):
+            try:
+                if is_indexed(version):
+                    pending.discard(version)
+            except Exception:
+                pass
+        if not pending:
+            print("✅ Processing complete")
+            return
+        time.sleep(interval)
+
+    print(f"⚠️ Processing not confirmed after {timeout}s, continuing")
 
 def test_unified_search():
     """Test unified search across v1 and v2 data"""
@@ -169,43 +196,51 @@ def test_unified_search():
         "embedding generation"
     ]
     
-    for query in search_queries:
-        print(f"\n🔍 Testing query: '{query}'")
-        
+    def run_search(query):
         # Test search with both versions
         search_data = {
             "query": query,
             "orgId": "test_org_123",
+            "fileIds": list(FILE_IDS.values()),
             "top_k": 5,
             "ragversion": "both"
         }
-        
         try:
-            response = requests.post(
+            return SESSION.post(
                 f"{MAIN_SERVER_URL}/api/v3/search",
                 json=search_data,
                 timeout=30
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"✅ Search successful:")
-                print(f"   Total results: {result['total_results']}")
-                print(f"   V1 results: {result['sources'].get('v1', {}).get('count', 0)}")
-                print(f"   V2 results: {result['sources'].get('v2', {}).get('count', 0)}")
-                
-                # Show top results
-                for i, res in enumerate(result['combined_results'][:2]):
-                    source = res.get('source_type', 'unknown')
-                    score = res.get('score', res.get('similarity_score', 'N/A'))
-                    content = res.get('content', res.get('text', ''))[:100]
-                    print(f"   Result {i+1} ({source}): {content}... (score: {score})")
-                    
-            else:
-                print(f"❌ Search failed: {response.status_code} - {response.text}")
-                
         except Exception as e:
-            print(f"❌ Search error: {e}")
+            return e
+
+    # Run the searches concurrently, then report them in order
+    with ThreadPoolExecutor(max_workers=len(search_queries)) as executor:
+        responses = list(executor.map(run_search, search_queries))
+
+    for query, response in zip(search_queries, responses):
+        print(f"\n🔍 Testing query: '{query}'")
+
+        if isinstance(response, Exception):
+            print(f"❌ Search error: {response}")
+            continue
+
+        if response.status_code == 200:
+            result = response.json()
+            print(f"✅ Search successful:")
+            print(f"   Total results: {result['total_results']}")
+            print(f"   V1 results: {result['sources'].get('v1', {}).get('count', 0)}")
+            print(f"   V2 results: {result['sources'].get('v2', {}).get('count', 0)}")
+
+            # Show top results
+            for i, res in enumerate(result['combined_results'][:2]):
+                source = res.get('source_type', 'unknown')
+                score = res.get('score', res.get('similarity_score', 'N/A'))
+                content = res.get('content', res.get('text', ''))[:100]
+                print(f"   Result {i+1} ({source}): {content}... (score: {score})")
+
+        else:
+            print(f"❌ Search failed: {response.status_code} - {response.text}")
 
 def test_noderag_direct_search():
     """Test direct NodeRAG service search"""
@@ -218,7 +253,7 @@ def test_noderag_direct_search():
     }
     
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{NODERAG_SERVICE_URL}/api/v1/search",
             json=search_data,
             timeout=30
@@ -251,12 +286,12 @@ def main():
         print("❌ Health checks failed. Ensure both services are running.")
         return
     
-    # Test 2: Document uploads
+    # Test 2: Document uploads (run concurrently)
     print("\n" + "=" * 50)
-    v1_success = test_document_upload_v1()
-    
-    print("\n" + "=" * 50) 
-    v2_success = test_document_upload_v2()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        v1_future = executor.submit(test_document_upload_v1)
+        v2_future = executor.submit(test_document_upload_v2)
+        v1_success, v2_success = v1_future.result(), v2_future.result()
     
     if not (v1_success or v2_success):
         print("❌ Both upload tests failed")
@@ -264,7 +299,7 @@ def main():
     
     # Test 3: Wait for processing
     print("\n" + "=" * 50)
-    wait_for_processing()
+    wait_for_processing([v for v, ok in (("v1", v1_success), ("v2", v2_success)) if ok])
     
     # Test 4: Search tests
     print("\n" + "=" * 50)